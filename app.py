@@ -1,9 +1,23 @@
 import os
 import re
+import io
+import csv
 import json
-from flask import Flask, render_template, request, jsonify
-import gspread
-from google.oauth2.service_account import Credentials
+import hashlib
+import hmac
+import time
+import tempfile
+from contextlib import contextmanager
+from functools import wraps
+from flask import Flask, Response, g, render_template, request, jsonify, send_file, stream_with_context
+
+from catalog import Catalog, CatalogManager
+from compact_table import CompactTable
+from metrics import CONTENT_TYPE, Counter, Gauge, Histogram, registry
+from profiling import SampledProfiler, server_timing_header
+from result_cache import ResultCache
+from search_index import AnalogIndex, ComponentIndex, RecordIndex, UnionFind
+from sheets import fetch_modified_time, fetch_worksheets, is_brake_pads_sheet, is_wipers_sheet, worksheet_hash
 
 app = Flask(__name__)
 
@@ -18,75 +32,141 @@ def preprocess_part_number(part_number):
     return normalized
 
 # Приведение строк к единообразному виду для сопоставления
+NON_ALNUM_RE = re.compile(r'[^A-Za-z0-9]')
+
 def normalize_token_for_match(value):
     """Uppercase + удаление всех неалфанумерик символов (пробелы, дефисы и т.п.)."""
     if not isinstance(value, str):
         return ''
-    return re.sub(r'[^A-Za-z0-9]', '', value).upper().strip()
+    return NON_ALNUM_RE.sub('', value).upper().strip()
+
+def keyword_pattern(keywords):
+    """Одно регулярное выражение «есть хотя бы одно из слов» для текста в нижнем регистре"""
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+
+# Правила классификации строк листов (проверяются по ячейке в нижнем регистре)
+WIPERS_ROW_EXCLUDE_RE = keyword_pattern(['wipers', 'front', 'back', 'brake', 'pad', 'тормоз'])
+BRAKE_PADS_CELL_RE = keyword_pattern(['brake', 'pad', 'тормоз'])
+BRAKE_PADS_ROW_EXCLUDE_RE = keyword_pattern([
+    'brake', 'pads', 'front', 'back', 'rear', 'part number', 'oe analogue', 'not original', 'wiper', 'wipe', 'щетк'
+])
+WIPERS_CELL_RE = keyword_pattern(['wiper', 'wipe', 'щетк'])
+FRONT_PADS_HEADER_RE = keyword_pattern(['front brake', 'front pads'])
+REAR_PADS_HEADER_RE = keyword_pattern(['back brake', 'rear brake', 'back pads', 'rear pads'])
+
+# Разбор списка аналогов: пометки в скобках, разделители и допустимый артикул
+PARENTHESES_RE = re.compile(r"\([^)]*\)")
+ALT_PARTS_SEPARATOR_RE = re.compile(r'[/,\s]+')
+# Только латиница/цифры, обязательно хотя бы одна цифра
+PART_TOKEN_RE = re.compile(r'[A-Za-z0-9]*[0-9][A-Za-z0-9]*')
+# Ячейки колодок делятся по настоящим разделителям: внутри артикула бывают
+# пробелы (Bosch "0 986 494 123", VAG "1K0 698 151", "GDB 1550"), а также
+# дефисы и точки (123-45, 0.986) — при сравнении они убираются. Но через пробел
+# пишут и два артикула ("GDB1550 FDB4050"), поэтому части через пробел
+# индексируются ещё и по отдельности
+BRAKE_PADS_SEPARATOR_RE = re.compile(r'[/,;\n]+')
+BRAKE_PADS_TOKEN_RE = re.compile(r'[A-Za-z0-9. -]*[0-9][A-Za-z0-9. -]*')
+# Более короткие обрывки ("0", "12") не считаются артикулами
+BRAKE_PADS_MIN_TOKEN_LENGTH = 3
+
+def brake_pads_title_section(title):
+    """Тип тормозных колодок по названию листа (или само название)"""
+    worksheet_title = title.lower()
+    if 'front' in worksheet_title and ('brake' in worksheet_title or 'pad' in worksheet_title):
+        return 'Front Brake Pads'
+    if ('back' in worksheet_title or 'rear' in worksheet_title) and ('brake' in worksheet_title or 'pad' in worksheet_title):
+        return 'Rear Brake Pads'
+    return title  # Используем название листа как есть
+
+def iter_sheet_records(title, rows, wipers=True, brake_pads=True):
+    """Разбирает строки листа за один проход.
+
+    Выдаёт кортежи ('wipers', main_part, alt_parts, section) и
+    ('brake_pads', main_part, oe_analogue, not_original, section) в порядке строк.
+    Оба разбора (щётки и колодки) идут по одной ячейке в нижнем регистре;
+    wipers/brake_pads отключают ненужный.
+    """
+    wipers_section = None
+    brake_pads_section = brake_pads_title_section(title)
+    
+    for row in rows:
+        if not row:
+            continue
+        main_part = row[0].strip()
+        if not main_part:
+            continue
+        first = row[0].lower()
+        
+        if wipers:
+            # Определяем секцию по заголовкам
+            if 'front wipers' in first:
+                wipers_section = 'Front Wipers'
+            elif 'back wipers' in first:
+                wipers_section = 'Back Wipers'
+            elif len(row) >= 2:
+                alt_parts = row[1].strip()
+                # Проверяем, что это не данные о тормозных колодках
+                if (alt_parts and not WIPERS_ROW_EXCLUDE_RE.search(first) and
+                        not BRAKE_PADS_CELL_RE.search(row[1].lower())):
+                    yield 'wipers', main_part, alt_parts, wipers_section
+        
+        if brake_pads:
+            # Определяем секцию по заголовкам (если не определили по названию листа)
+            if brake_pads_section == title:
+                if FRONT_PADS_HEADER_RE.search(first):
+                    brake_pads_section = 'Front Brake Pads'
+                elif REAR_PADS_HEADER_RE.search(first):
+                    brake_pads_section = 'Rear Brake Pads'
+            
+            if len(row) >= 3:
+                # Сохраняем отдельно OE analogue и Not Original
+                oe_analogue = row[1].strip()
+                not_original = row[2].strip()
+                # Исключаем заголовки и данные о щетках стеклоочистителей
+                if ((oe_analogue or not_original) and not BRAKE_PADS_ROW_EXCLUDE_RE.search(first) and
+                        not WIPERS_CELL_RE.search(row[1].lower()) and
+                        not WIPERS_CELL_RE.search(row[2].lower())):
+                    yield 'brake_pads', main_part, oe_analogue, not_original, brake_pads_section
+
+def parse_wipers_sheet(title, rows):
+    """Разбирает строки листа со щётками стеклоочистителей"""
+    return [
+        {'main_part': main_part, 'alt_parts': alt_parts, 'section': section}
+        for _, main_part, alt_parts, section in iter_sheet_records(title, rows, brake_pads=False)
+    ]
+
+def parse_brake_pads_sheet(title, rows):
+    """Разбирает строки листа с тормозными колодками"""
+    return [
+        {'main_part': main_part, 'oe_analogue': oe_analogue, 'not_original': not_original, 'section': section}
+        for _, main_part, oe_analogue, not_original, section in iter_sheet_records(title, rows, wipers=False)
+    ]
 
-# Настройка Google Sheets API
-SCOPES = [
-    'https://www.googleapis.com/auth/spreadsheets',
-    'https://www.googleapis.com/auth/drive'
-]
+def parse_worksheets(worksheets):
+    """Распределяет листы между парсерами щёток и колодок по названию листа.
+
+    Листы без явных ключевых слов разбираются обоими парсерами, как и раньше.
+    Возвращает (сырые данные щёток, сырые данные колодок).
+    """
+    wipers = []
+    brake_pads = []
+    
+    for title, rows in worksheets:
+        try:
+            if not is_brake_pads_sheet(title):
+                wipers.extend(parse_wipers_sheet(title, rows))
+            if not is_wipers_sheet(title):
+                brake_pads.extend(parse_brake_pads_sheet(title, rows))
+        except Exception as e:
+            print(f"Ошибка при чтении листа {title}: {e}")
+            continue
+    
+    return wipers, brake_pads
 
 def get_google_sheets_data():
     """Получает данные из Google Sheets с информацией о щетках стеклоочистителей"""
     try:
-        # Проверяем наличие переменной окружения
-        service_account_key = os.getenv("GOOGLE_SERVICE_ACCOUNT_KEY")
-        if not service_account_key:
-            raise ValueError("GOOGLE_SERVICE_ACCOUNT_KEY не установлен в переменной окружения")
-        
-        # Загружаем JSON ключ из переменной окружения
-        service_account_info = json.loads(service_account_key)
-        credentials = Credentials.from_service_account_info(service_account_info, scopes=SCOPES)
-        
-        client = gspread.authorize(credentials)
-        
-        # Получаем ID таблицы из переменной окружения
-        spreadsheet_id = os.getenv('GOOGLE_SHEETS_ID')
-        if not spreadsheet_id:
-            raise ValueError("GOOGLE_SHEETS_ID не установлен в переменной окружения")
-        
-        # Открываем таблицу
-        spreadsheet = client.open_by_key(spreadsheet_id)
-        
-        all_data = []
-        
-        for worksheet in spreadsheet.worksheets():
-            try:
-                worksheet_title = worksheet.title.lower()
-                
-                # Пропускаем листы с тормозными колодками
-                if any(keyword in worksheet_title for keyword in ['brake', 'pad', 'тормоз']):
-                    continue
-                
-                data = worksheet.get_all_values()
-                current_section = None
-                
-                for row in data:
-                    if len(row) > 0 and row[0].strip():
-                        # Определяем секцию по заголовкам
-                        if 'front wipers' in row[0].lower():
-                            current_section = 'Front Wipers'
-                        elif 'back wipers' in row[0].lower():
-                            current_section = 'Back Wipers'
-                        elif len(row) >= 2 and row[0].strip() and row[1].strip():
-                            # Проверяем, что это не данные о тормозных колодках
-                            if (not any(keyword in row[0].lower() for keyword in ['wipers', 'front', 'back', 'brake', 'pad', 'тормоз']) and
-                                not any(keyword in row[1].lower() for keyword in ['brake', 'pad', 'тормоз'])):
-                                all_data.append({
-                                    'main_part': row[0].strip(),
-                                    'alt_parts': row[1].strip(),
-                                    'section': current_section
-                                })
-            except Exception as e:
-                print(f"Ошибка при чтении листа {worksheet.title}: {e}")
-                continue
-        
-        return all_data
-        
+        return parse_worksheets(fetch_worksheets())[0]
     except Exception as e:
         print(f"Ошибка при получении данных из Google Sheets: {e}")
         return []
@@ -94,168 +174,125 @@ def get_google_sheets_data():
 def get_brake_pads_data():
     """Получает данные из Google Sheets с информацией о тормозных колодках"""
     try:
-        # Проверяем наличие переменной окружения
-        service_account_key = os.getenv("GOOGLE_SERVICE_ACCOUNT_KEY")
-        if not service_account_key:
-            raise ValueError("GOOGLE_SERVICE_ACCOUNT_KEY не установлен в переменной окружения")
-        
-        # Загружаем JSON ключ из переменной окружения
-        service_account_info = json.loads(service_account_key)
-        credentials = Credentials.from_service_account_info(service_account_info, scopes=SCOPES)
-        
-        client = gspread.authorize(credentials)
-        
-        # Получаем ID таблицы из переменной окружения
-        spreadsheet_id = os.getenv('GOOGLE_SHEETS_ID')
-        if not spreadsheet_id:
-            raise ValueError("GOOGLE_SHEETS_ID не установлен в переменной окружения")
-        
-        # Открываем таблицу
-        spreadsheet = client.open_by_key(spreadsheet_id)
-        
-        # Получаем все листы
-        all_data = []
-        
-        for worksheet in spreadsheet.worksheets():
-            try:
-                worksheet_title = worksheet.title.lower()
-                
-                # Пропускаем листы со щетками стеклоочистителей
-                if any(keyword in worksheet_title for keyword in ['wiper', 'wipe', 'щетк']):
-                    continue
-                
-                data = worksheet.get_all_values()
-                current_section = None
-                
-                # Определяем тип тормозных колодок по названию листа
-                if 'front' in worksheet_title and ('brake' in worksheet_title or 'pad' in worksheet_title):
-                    current_section = 'Front Brake Pads'
-                elif ('back' in worksheet_title or 'rear' in worksheet_title) and ('brake' in worksheet_title or 'pad' in worksheet_title):
-                    current_section = 'Rear Brake Pads'
-                else:
-                    current_section = worksheet.title  # Используем название листа как есть
-                
-                # Определяем тип тормозных колодок по содержимому листа
-                for row in data:
-                    if len(row) > 0 and row[0].strip():
-                        # Определяем секцию по заголовкам (если не определили по названию листа)
-                        if current_section == worksheet.title:
-                            if 'front brake' in row[0].lower() or 'front pads' in row[0].lower():
-                                current_section = 'Front Brake Pads'
-                            elif 'back brake' in row[0].lower() or 'rear brake' in row[0].lower() or 'back pads' in row[0].lower() or 'rear pads' in row[0].lower():
-                                current_section = 'Rear Brake Pads'
-                        
-                        if len(row) >= 3 and row[0].strip():
-                            # Проверяем, что это не заголовок и есть данные в колонках
-                            # Исключаем данные о щетках стеклоочистителей
-                            if (not any(keyword in row[0].lower() for keyword in ['brake', 'pads', 'front', 'back', 'rear', 'part number', 'oe analogue', 'not original', 'wiper', 'wipe', 'щетк']) and
-                                not any(keyword in row[1].lower() for keyword in ['wiper', 'wipe', 'щетк']) and
-                                not any(keyword in row[2].lower() for keyword in ['wiper', 'wipe', 'щетк']) and
-                                row[0].strip() and (row[1].strip() or row[2].strip())):
-                                
-                                # Сохраняем отдельно OE analogue и Not Original
-                                oe_analogue = row[1].strip() if len(row) > 1 else ''
-                                not_original = row[2].strip() if len(row) > 2 else ''
-                                
-                                all_data.append({
-                                    'main_part': row[0].strip(),
-                                    'oe_analogue': oe_analogue,
-                                    'not_original': not_original,
-                                    'section': current_section
-                                })
-                            
-            except Exception as e:
-                print(f"Ошибка при чтении листа {worksheet.title}: {e}")
-                continue
-        
-        return all_data
-        
+        return parse_worksheets(fetch_worksheets())[1]
     except Exception as e:
         print(f"Ошибка при получении данных из Google Sheets: {e}")
         return []
 
+# Поля компактных таблиц каталога: общие для исходной строки и собственные поля строки
+WIPERS_GROUP_FIELDS = ('main_part', 'section')
+BRAKE_PADS_GROUP_FIELDS = ('main_part', 'section', 'oe_analogue', 'not_original')
+ROW_FIELDS = ('alt_part',)
+
+def add_wipers_rows(table, main_part, alt_parts_str, section):
+    """Добавляет в таблицу щёток основной артикул и его аналоги из ячейки.
+
+    Повторяющиеся артикулы хранятся в таблице в одном экземпляре.
+    """
+    group_id = table.add_group(main_part, section)
+    # 1) Удаляем любые пометки в скобках полностью: (change mounting), (note) и т.п.
+    # 2) Разделяем по '/', ',', пробелам
+    # 3) Оставляем только артикулы: латиница/цифры без пробелов, хотя бы одна цифра
+    tokens = ALT_PARTS_SEPARATOR_RE.split(PARENTHESES_RE.sub('', alt_parts_str))
+    # Сам основной артикул идёт первым как альтернатива для корректной работы префиксного поиска
+    table.add_rows(group_id, [main_part] + [token for token in tokens if PART_TOKEN_RE.fullmatch(token)])
+
+def split_brake_pads_cell(cell):
+    """Артикулы из ячейки OE analogue / Not Original.
+
+    Пометки в скобках удаляются, ячейка делится по '/', ',', ';' и переводам
+    строки; остаются токены с хотя бы одной цифрой и не короче
+    BRAKE_PADS_MIN_TOKEN_LENGTH значащих символов. Токен с пробелами даёт
+    и целый артикул, и каждую свою часть, подходящую под те же условия.
+    """
+    if not cell:
+        return []
+    result = []
+    for token in BRAKE_PADS_SEPARATOR_RE.split(PARENTHESES_RE.sub('', cell)):
+        token = token.strip()
+        if not is_brake_pads_token(token):
+            continue
+        result.append(token)
+        pieces = token.split()
+        if len(pieces) > 1:
+            result.extend(piece for piece in pieces if is_brake_pads_token(piece) and piece not in result)
+    return result
+
+def is_brake_pads_token(token):
+    """Похож ли фрагмент ячейки колодок на артикул"""
+    return bool(BRAKE_PADS_TOKEN_RE.fullmatch(token)) and len(normalize_token_for_match(token)) >= BRAKE_PADS_MIN_TOKEN_LENGTH
+
+def add_brake_pads_rows(table, main_part, oe_analogue, not_original, section):
+    """Добавляет в таблицу колодок основной артикул и артикулы из OE analogue и Not Original.
+
+    Ячейки целиком хранятся один раз на исходную строку (для ответа), а
+    строки таблицы — по одному артикулу, как у щёток.
+    """
+    group_id = table.add_group(main_part, section, oe_analogue, not_original)
+    table.add_rows(group_id, [main_part] + split_brake_pads_cell(oe_analogue) + split_brake_pads_cell(not_original))
+
 def normalize_data(raw_data):
-    """Нормализует данные из таблицы в формат main_part | alt_part с информацией о типе щёток"""
-    normalized_data = []
+    """Нормализует данные из таблицы в формат main_part | alt_part с информацией о типе щёток.
+
+    Возвращает CompactTable: строки читаются как словари с полями
+    main_part, alt_part и section.
+    """
+    normalized_data = CompactTable(WIPERS_GROUP_FIELDS, ROW_FIELDS)
     
     for item in raw_data:
         if isinstance(item, dict) and 'main_part' in item and 'alt_parts' in item:
-            main_part = item['main_part']
-            alt_parts_str = item['alt_parts']
-            section = item.get('section', 'Unknown')
-            
-            if main_part and alt_parts_str:
-                # 1) Удаляем любые пометки в скобках полностью: (change mounting), (note) и т.п.
-                alt_parts_clean = re.sub(r"\([^)]*\)", "", alt_parts_str)
-                # 2) Разделяем по '/', ',', пробелам
-                raw_tokens = re.split(r'[/,\s]+', alt_parts_clean)
-                
-                # Добавляем сам основной артикул как альтернативу для корректной работы префиксного поиска
-                normalized_data.append({
-                    'main_part': main_part,
-                    'alt_part': main_part,
-                    'section': section
-                })
-
-                for alt_part in raw_tokens:
-                    token = alt_part.strip()
-                    if not token:
-                        continue
-                    # 3) Оставляем только артикулы: латиница/цифры без пробелов, обязательно содержит хотя бы одну цифру
-                    if not re.fullmatch(r'[A-Za-z0-9]+', token):
-                        continue
-                    if not re.search(r'\d', token):
-                        continue
-                    normalized_data.append({
-                        'main_part': main_part,
-                        'alt_part': token,
-                        'section': section
-                    })
-    
-    return normalized_data
+            if item['main_part'] and item['alt_parts']:
+                add_wipers_rows(normalized_data, item['main_part'], item['alt_parts'], item.get('section', 'Unknown'))
+    
+    return normalized_data.freeze()
 
 def normalize_brake_pads_data(raw_data):
-    """Нормализует данные тормозных колодок для поиска"""
-    normalized_data = []
+    """Нормализует данные тормозных колодок для поиска.
+
+    Возвращает CompactTable со строками main_part, alt_part, section,
+    oe_analogue и not_original: alt_part — основной артикул и каждый артикул
+    из ячеек OE analogue и Not Original; сами ячейки хранятся один раз на
+    исходную строку.
+    """
+    normalized_data = CompactTable(BRAKE_PADS_GROUP_FIELDS, ROW_FIELDS)
     
     for item in raw_data:
-        if isinstance(item, dict) and 'main_part' in item:
-            main_part = item['main_part']
-            oe_analogue = item.get('oe_analogue', '')
-            not_original = item.get('not_original', '')
-            section = item.get('section', 'Unknown')
-            
-            if main_part:
-                # Добавляем основной артикул
-                normalized_data.append({
-                    'main_part': main_part,
-                    'alt_part': main_part,
-                    'section': section,
-                    'oe_analogue': oe_analogue,
-                    'not_original': not_original
-                })
-                
-                # Добавляем OE analogue как альтернативу
-                if oe_analogue:
-                    normalized_data.append({
-                        'main_part': main_part,
-                        'alt_part': oe_analogue,
-                        'section': section,
-                        'oe_analogue': oe_analogue,
-                        'not_original': not_original
-                    })
-                
-                # Добавляем Not Original как альтернативу
-                if not_original:
-                    normalized_data.append({
-                        'main_part': main_part,
-                        'alt_part': not_original,
-                        'section': section,
-                        'oe_analogue': oe_analogue,
-                        'not_original': not_original
-                    })
-    
-    return normalized_data
+        if isinstance(item, dict) and 'main_part' in item and item['main_part']:
+            add_brake_pads_rows(
+                normalized_data,
+                item['main_part'],
+                item.get('oe_analogue', ''),
+                item.get('not_original', ''),
+                item.get('section', 'Unknown')
+            )
+    
+    return normalized_data.freeze()
+
+def normalize_worksheet(title, rows):
+    """Разбирает лист сразу в нормализованные таблицы (щётки, колодки).
+
+    Один проход по строкам без промежуточных словарей; результат совпадает с
+    normalize_data/normalize_brake_pads_data от parse_worksheets для этого листа.
+    """
+    wipers = CompactTable(WIPERS_GROUP_FIELDS, ROW_FIELDS)
+    brake_pads = CompactTable(BRAKE_PADS_GROUP_FIELDS, ROW_FIELDS)
+    try:
+        records = iter_sheet_records(
+            title,
+            rows,
+            wipers=not is_brake_pads_sheet(title),
+            brake_pads=not is_wipers_sheet(title)
+        )
+        for record in records:
+            if record[0] == 'wipers':
+                add_wipers_rows(wipers, *record[1:])
+            else:
+                add_brake_pads_rows(brake_pads, *record[1:])
+    except Exception as e:
+        print(f"Ошибка при чтении листа {title}: {e}")
+        wipers = CompactTable(WIPERS_GROUP_FIELDS, ROW_FIELDS)
+        brake_pads = CompactTable(BRAKE_PADS_GROUP_FIELDS, ROW_FIELDS)
+    return wipers.freeze(), brake_pads.freeze()
 
 def search_analogs(part_number, data):
     """Ищет аналоги для заданного артикула"""
@@ -290,6 +327,174 @@ def search_analogs(part_number, data):
     
     return result
 
+def build_analog_index(data):
+    """Строит хэш-индекс аналогов один раз на версию каталога.
+
+    Для каждого нормализованного main/alt артикула заранее собираются те же группы,
+    что вернул бы search_analogs, поэтому поиск сводится к одному обращению к словарю.
+    """
+    token_groups = {}
+    
+    for row_number, item in enumerate(data):
+        main_part = item['main_part']
+        alt_part = item['alt_part']
+        section = item.get('section', 'Unknown')
+        main_norm = normalize_token_for_match(main_part)
+        alt_norm = normalize_token_for_match(alt_part)
+        
+        for token in (main_norm, alt_norm) if main_norm != alt_norm else (main_norm,):
+            groups = token_groups.setdefault(token, {})
+            if main_part not in groups:
+                groups[main_part] = (set(), section, row_number)
+            parts = groups[main_part][0]
+            parts.add(alt_part)
+            parts.add(main_part)
+    
+    return AnalogIndex.build(token_groups)
+
+def build_component_index(data):
+    """Считает транзитивные группы аналогов один раз на версию каталога.
+
+    Артикулы, связанные через общие аналоги (A≍B, B≍C), объединяются union-find
+    в одну компоненту. Главным артикулом компоненты считается первый по порядку
+    строк каталога, его секция — секцией компоненты.
+    """
+    union_find = UnionFind()
+    norms = []
+    
+    for item in data:
+        main_norm = normalize_token_for_match(item['main_part'])
+        alt_norm = normalize_token_for_match(item['alt_part'])
+        norms.append(main_norm)
+        if not main_norm:
+            continue
+        if alt_norm:
+            union_find.union(main_norm, alt_norm)
+        else:
+            union_find.find(main_norm)
+    
+    # корень -> (main_part -> секция, все артикулы, секции по порядку)
+    components = {}
+    for item, main_norm in zip(data, norms):
+        if not main_norm:
+            continue
+        root = union_find.find(main_norm)
+        if root not in components:
+            components[root] = ({}, set(), {})
+        main_parts, parts, sections = components[root]
+        section = item.get('section', 'Unknown')
+        main_parts.setdefault(item['main_part'], section)
+        parts.add(item['main_part'])
+        parts.add(item['alt_part'])
+        if section:
+            sections[section] = None
+    
+    groups = []
+    component_ids = {}
+    for root, (main_parts, parts, sections) in components.items():
+        component_ids[root] = len(groups)
+        main_part, section = next(iter(main_parts.items()))
+        groups.append((main_part, tuple(sorted(parts)), section, tuple(main_parts), tuple(sections)))
+    
+    tokens = {token: component_ids[union_find.find(token)] for token in union_find.parent}
+    return ComponentIndex(groups, tokens)
+
+def search_analogs_transitive(part_number, components):
+    """Полная группа взаимозаменяемости (транзитивно) для артикула"""
+    group = components.lookup(normalize_token_for_match(part_number))
+    if group is None:
+        return []
+    main_part, all_parts, section, main_parts, sections = group
+    return [{
+        'main_part': main_part,
+        'all_parts': list(all_parts),
+        'section': section,
+        'main_parts': list(main_parts),
+        'sections': list(sections)
+    }]
+
+def search_analogs_indexed(part_number, index):
+    """Ищет аналоги по хэш-индексу; результат совпадает с search_analogs"""
+    return [
+        {
+            'main_part': main_part,
+            'all_parts': list(all_parts),
+            'section': section
+        }
+        for main_part, all_parts, section in index.lookup(normalize_token_for_match(part_number))
+    ]
+
+def search_fuzzy_indexed(part_number, index, max_distance=2, limit=10):
+    """Ищет аналоги для артикула с опечаткой (расстояние правки 1–2).
+
+    Берёт до limit ближайших нормализованных артикулов и возвращает их группы,
+    ближайшие первыми; к каждой группе добавляются matched_part и distance.
+    Группа с тем же main_part повторно не выводится.
+    """
+    query = normalize_token_for_match(part_number)
+    result = []
+    seen = set()
+    for token, distance in index.fuzzy.search(query, max_distance, limit):
+        for main_part, all_parts, section in index.lookup(token):
+            if main_part in seen:
+                continue
+            seen.add(main_part)
+            result.append({
+                'main_part': main_part,
+                'all_parts': list(all_parts),
+                'section': section,
+                'matched_part': token,
+                'distance': distance
+            })
+    return result
+
+def search_by_prefix_indexed(part_prefix, index, prefix_length=3, limit=None):
+    """Ищет группы по префиксу артикула через отсортированные ключи индекса.
+
+    prefix_length задаёт, сколько первых символов запроса учитывать (не меньше 3,
+    None — весь запрос); limit ограничивает число групп. При prefix_length=3 и без
+    limit результат совпадает с search_by_prefix.
+    """
+    prefix = normalize_token_for_match(part_prefix)
+    if len(prefix) < 3:
+        return []
+    if prefix_length is not None:
+        prefix = prefix[:max(prefix_length, 3)]
+    
+    # main_part -> [first_row, section, parts]
+    found_groups = {}
+    for token in index.prefix.iter_prefix(prefix):
+        for (main_part, parts, section), first_row in index.entries(token):
+            group = found_groups.get(main_part)
+            if group is None:
+                found_groups[main_part] = [first_row, section, parts]
+                continue
+            if first_row < group[0]:
+                group[0] = first_row
+                group[1] = section
+            if group[2] is not parts:
+                group[2] = set(group[2]).union(parts)
+    
+    ordered = sorted(found_groups.items(), key=lambda entry: entry[1][0])
+    if limit is not None:
+        ordered = ordered[:limit]
+    
+    result = []
+    for main_part, (_, section, parts) in ordered:
+        result.append({
+            'main_part': main_part,
+            'all_parts': sorted(parts) if isinstance(parts, set) else list(parts),
+            'section': section
+        })
+    return result
+
+def suggest_part_numbers(part_prefix, index, limit=8):
+    """Подсказки при вводе: до limit нормализованных артикулов, начинающихся с запроса"""
+    prefix = normalize_token_for_match(part_prefix)
+    if not prefix:
+        return []
+    return index.prefix.complete(prefix, limit)
+
 def search_by_prefix(part_prefix, data):
     """Ищет группы по первым 3 символам артикула (без учета регистра)."""
     prefix = normalize_token_for_match(part_prefix)
@@ -321,40 +526,277 @@ def search_by_prefix(part_prefix, data):
         })
     return result
 
+def brake_pads_record(record):
+    """Запись индекса колодок -> элемент ответа поиска"""
+    main_part, section, oe_analogue, not_original = record
+    return {
+        'main_part': main_part,
+        'section': section,
+        'oe_analogue': oe_analogue,
+        'not_original': not_original
+    }
+
 def search_brake_pads_analogs(part_number, data):
-    """Ищет аналоги тормозных колодок для заданного артикула"""
-    part_number = part_number.upper().strip()
+    """Ищет аналоги тормозных колодок для заданного артикула (линейный проход).
+
+    Сравнение — по нормализованным артикулам: основному и каждому артикулу
+    из ячеек OE analogue и Not Original.
+    """
+    part_number_norm = normalize_token_for_match(part_number)
+    if not part_number_norm:
+        return []
     found_groups = {}
     
     # Ищем артикул в данных
     for item in data:
-        if (item['main_part'].upper() == part_number or 
-            item['alt_part'].upper() == part_number):
+        if (normalize_token_for_match(item['main_part']) == part_number_norm or
+                normalize_token_for_match(item['alt_part']) == part_number_norm):
             
             main_part = item['main_part']
-            section = item.get('section', 'Unknown')
-            oe_analogue = item.get('oe_analogue', '')
-            not_original = item.get('not_original', '')
-            
             if main_part not in found_groups:
-                found_groups[main_part] = {
-                    'section': section,
-                    'oe_analogue': oe_analogue,
-                    'not_original': not_original
-                }
+                found_groups[main_part] = (
+                    main_part,
+                    item.get('section', 'Unknown'),
+                    item.get('oe_analogue', ''),
+                    item.get('not_original', '')
+                )
     
-    # Преобразуем в список для ответа
-    result = []
-    for main_part, group_info in found_groups.items():
-        result.append({
-            'main_part': main_part,
-            'section': group_info['section'],
-            'oe_analogue': group_info['oe_analogue'],
-            'not_original': group_info['not_original']
-        })
+    return [brake_pads_record(record) for record in found_groups.values()]
+
+def build_brake_pads_index(data):
+    """Строит хэш-индекс колодок один раз на версию каталога.
+
+    Для каждого нормализованного артикула заранее собираются те же записи, что
+    вернул бы search_brake_pads_analogs: по одной на основной артикул, из
+    первой совпавшей строки.
+    """
+    token_records = {}
+    
+    for item in data:
+        main_part = item['main_part']
+        main_norm = normalize_token_for_match(main_part)
+        alt_norm = normalize_token_for_match(item['alt_part'])
+        record = None
+        for token in (main_norm, alt_norm) if main_norm != alt_norm else (main_norm,):
+            if not token:
+                continue
+            records = token_records.setdefault(token, {})
+            if main_part not in records:
+                if record is None:
+                    record = (main_part, item.get('section', 'Unknown'), item['oe_analogue'], item['not_original'])
+                records[main_part] = record
     
+    return RecordIndex.build({token: list(records.values()) for token, records in token_records.items()})
+
+def search_brake_pads_indexed(part_number, index):
+    """То же, что search_brake_pads_analogs, но одним обращением к индексу"""
+    return [brake_pads_record(record) for record in index.lookup(normalize_token_for_match(part_number))]
+
+def search_brake_pads_by_prefix(part_prefix, index, limit=20):
+    """Колодки, у которых основной артикул или аналог начинается с запроса (не короче 3 символов)"""
+    prefix = normalize_token_for_match(part_prefix)
+    if len(prefix) < 3:
+        return []
+    result = []
+    seen = set()
+    for token in index.prefix.iter_prefix(prefix):
+        for record in index.lookup(token):
+            if record[0] in seen:
+                continue
+            seen.add(record[0])
+            result.append(brake_pads_record(record))
+            if len(result) >= limit:
+                return result
     return result
 
+def search_brake_pads_fuzzy(part_number, index, max_distance=2, limit=10):
+    """Колодки по артикулам, отличающимся от запроса не больше чем на max_distance правок"""
+    query = normalize_token_for_match(part_number)
+    if not query:
+        return []
+    result = []
+    seen = set()
+    for token, distance in index.fuzzy.search(query, max_distance, limit):
+        for record in index.lookup(token):
+            if record[0] in seen:
+                continue
+            seen.add(record[0])
+            item = brake_pads_record(record)
+            item['matched_part'] = token
+            item['distance'] = distance
+            result.append(item)
+    return result
+
+# Семейства каталога: метки результатов /lookup и значения фильтра family
+LOOKUP_FAMILIES = ('wipers', 'brake-pads')
+
+def build_lookup_index(wiper_index, brake_pads_index):
+    """Общий индекс всех каталогов: нормализованный артикул -> записи с семейством и секцией.
+
+    Собирается из готовых индексов щёток (прямые группы аналогов) и колодок, без
+    повторной нормализации; записи — ('wipers', section, main_part, all_parts) и
+    ('brake-pads', section, main_part, oe_analogue, not_original). Поиск с
+    опечатками для общего индекса не строится.
+    """
+    token_records = {}
+    for token in wiper_index.tokens:
+        token_records[token] = [
+            ('wipers', section, main_part, all_parts)
+            for main_part, all_parts, section in wiper_index.lookup(token)
+        ]
+    for token in brake_pads_index.tokens:
+        records = token_records.setdefault(token, [])
+        for main_part, section, oe_analogue, not_original in brake_pads_index.lookup(token):
+            records.append(('brake-pads', section, main_part, oe_analogue, not_original))
+    return RecordIndex.build(token_records, fuzzy=False)
+
+def lookup_record(record):
+    """Запись общего индекса -> элемент ответа /lookup"""
+    if record[0] == 'wipers':
+        family, section, main_part, all_parts = record
+        return {'family': family, 'section': section, 'main_part': main_part, 'all_parts': list(all_parts)}
+    family, section, main_part, oe_analogue, not_original = record
+    return {
+        'family': family,
+        'section': section,
+        'main_part': main_part,
+        'oe_analogue': oe_analogue,
+        'not_original': not_original
+    }
+
+def lookup_part_number(part_number, index, families=LOOKUP_FAMILIES, section=None, limit=20):
+    """Поиск артикула сразу во всех каталогах: (шаблон сообщения, результаты).
+
+    families и section (в нижнем регистре) ограничивают результаты. Без точного
+    совпадения возвращается до limit записей, артикулы которых начинаются с
+    запроса (не короче 3 символов).
+    """
+    def accepted(record):
+        return record[0] in families and (section is None or (record[1] or '').lower() == section)
+    
+    query = normalize_token_for_match(part_number)
+    results = [lookup_record(record) for record in index.lookup(query) if accepted(record)]
+    if results:
+        return SEARCH_FOUND, results
+    
+    if len(query) >= 3:
+        seen = set()
+        for token in index.prefix.iter_prefix(query):
+            for record in index.lookup(token):
+                if record in seen or not accepted(record):
+                    continue
+                seen.add(record)
+                results.append(lookup_record(record))
+                if len(results) >= limit:
+                    return PREFIX_FOUND, results
+        if results:
+            return PREFIX_FOUND, results
+    
+    return SEARCH_NOT_FOUND, []
+
+def catalog_version(*raw_parts):
+    """Версия каталога — хэш исходных данных, одинаковый во всех воркерах"""
+    payload = json.dumps(raw_parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+# Длительность этапов загрузки каталога: fetch — чтение листов, parse — разбор
+# и нормализация изменившихся листов (один проход), merge — объединение
+# листов, index — построение индексов
+catalog_stage_seconds = Histogram('catalog_stage_seconds', 'Длительность этапов загрузки каталога', ['stage'])
+
+# Размер кэша результатов поиска в каждом снимке каталога: популярные артикулы
+# не пересчитываются до смены версии. RESULT_CACHE_SIZE=0 отключает кэш.
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', 4096))
+
+def build_catalog(version, wipers, brake_pads, source_modified=None):
+    """Собирает снимок каталога со всеми индексами и пустым кэшем из нормализованных строк"""
+    with catalog_stage_seconds.time(stage='index'):
+        wiper_index = build_analog_index(wipers)
+        wiper_components = build_component_index(wipers)
+        brake_pads_index = build_brake_pads_index(brake_pads)
+        lookup_index = build_lookup_index(wiper_index, brake_pads_index)
+    return Catalog(
+        version=version,
+        wipers=wipers,
+        brake_pads=brake_pads,
+        wiper_index=wiper_index,
+        wiper_components=wiper_components,
+        brake_pads_index=brake_pads_index,
+        lookup_index=lookup_index,
+        result_cache=ResultCache(RESULT_CACHE_SIZE),
+        source_modified=source_modified,
+    )
+
+class CatalogLoader:
+    """Загружает каталог из таблицы, пересобирая только изменившиеся листы.
+
+    Сначала сверяется modifiedTime таблицы в Drive: если он совпадает с версией
+    текущего каталога, данные не скачиваются вовсе. Иначе все листы читаются
+    одним batchGet, и заново разбираются и нормализуются только листы, чей хэш
+    содержимого отличается от прошлой загрузки; индексы строятся по общему
+    списку строк.
+
+    С sheets (push-обновление по изменению листов) скачиваются только эти
+    листы, остальные берутся из прошлой загрузки; force — перечитать таблицу,
+    даже если modifiedTime ещё не изменился (Drive обновляет его с задержкой).
+    """
+
+    def __init__(self):
+        # title -> (хэш содержимого, нормализованные щётки, нормализованные колодки)
+        self._sheets = {}
+
+    def __call__(self, current=None, sheets=None, force=False):
+        # Точечная загрузка возможна только для уже известных листов:
+        # новый или переименованный лист требует чтения метаданных таблицы
+        if sheets is not None and (not sheets or not set(sheets).issubset(self._sheets)):
+            sheets, force = None, True
+        
+        modified_time = None
+        try:
+            modified_time = fetch_modified_time()
+        except Exception as e:
+            print(f"Не удалось получить modifiedTime таблицы: {e}")
+        if not force and sheets is None and current is not None and modified_time is not None and current.source_modified == modified_time:
+            return current
+        
+        with catalog_stage_seconds.time(stage='fetch'):
+            worksheets = fetch_worksheets(sorted(sheets) if sheets is not None else None)
+        
+        if sheets is not None:
+            # Остальные листы не перечитывались: следующая плановая проверка
+            # должна сверить их заново, а не довериться modifiedTime
+            modified_time = None
+        sheets = dict(self._sheets) if sheets is not None else {}
+        with catalog_stage_seconds.time(stage='parse'):
+            for title, rows in worksheets:
+                content_hash = worksheet_hash(rows)
+                cached = self._sheets.get(title)
+                if cached is None or cached[0] != content_hash:
+                    cached = (content_hash,) + normalize_worksheet(title, rows)
+                sheets[title] = cached
+        self._sheets = sheets
+        
+        version = catalog_version([(title, cached[0]) for title, cached in sheets.items()])
+        if current is not None and current.version == version:
+            return current.replace(source_modified=modified_time)
+        
+        with catalog_stage_seconds.time(stage='merge'):
+            wipers = CompactTable.concat([cached[1] for cached in sheets.values()], WIPERS_GROUP_FIELDS, ROW_FIELDS)
+            brake_pads = CompactTable.concat([cached[2] for cached in sheets.values()], BRAKE_PADS_GROUP_FIELDS, ROW_FIELDS)
+        if not wipers and not brake_pads:
+            return None
+        return build_catalog(version, wipers, brake_pads, source_modified=modified_time)
+
+# Каталог в памяти процесса; обновляется в фоне раз в CATALOG_TTL_SECONDS
+# и по запросам /admin/refresh. Снимок на диске позволяет воркеру стартовать
+# с данными без обращения к таблице и передаёт push-обновления другим воркерам.
+catalog_manager = CatalogManager(
+    CatalogLoader(),
+    snapshot_path=os.getenv('CATALOG_SNAPSHOT_PATH', 'catalog_snapshot.pickle'),
+    snapshot_source=os.getenv('GOOGLE_SHEETS_ID', ''),
+)
+catalog_manager.load_snapshot()
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -364,8 +806,304 @@ def brake_pads():
     """Страница поиска тормозных колодок"""
     return render_template('brake_pads.html')
 
-@app.route('/search', methods=['POST'])
+# Сообщения ответов поиска; {part_number} — запрос пользователя, {prefix} — учтённый префикс
+SEARCH_FOUND = 'Found analogs for part number "{part_number}":'
+SEARCH_NOT_FOUND = 'Part number "{part_number}" not found in database'
+SEARCH_SIMILAR = 'Part number "{part_number}" not found, similar part numbers:'
+PREFIX_FOUND = 'Found results for prefix "{prefix}":'
+PREFIX_NOT_FOUND = 'No results for prefix "{prefix}"'
+FUZZY_FOUND = 'Similar part numbers for "{part_number}":'
+FUZZY_NOT_FOUND = 'No similar part numbers for "{part_number}"'
+
+def search_message(template, part_number, prefix_length=3):
+    """Текст сообщения для конкретного запроса"""
+    prefix = part_number if prefix_length is None else part_number[:prefix_length]
+    return template.format(part_number=part_number, prefix=prefix.upper())
+
+# Нормализованные артикулы щёток и колодок — от 5–6 символов; запрос короче
+# скорее недописан, и для него поиск по префиксу полезнее похожих артикулов
+FUZZY_FIRST_MIN_LENGTH = 6
+
+def is_full_length_part_number(part_number):
+    """Запрос длиной с настоящий артикул: опечатки в нём ищутся раньше префикса"""
+    return len(normalize_token_for_match(part_number)) >= FUZZY_FIRST_MIN_LENGTH
+
+def wipers_search_results(part_number, catalog, fuzzy=False, transitive=True):
+    """Точный поиск аналогов щёток, при неудаче — поиск по первым 3 символам.
+
+    По умолчанию возвращается полная транзитивная группа взаимозаменяемости;
+    transitive=False даёт прежние прямые группы по main_part. С fuzzy=True
+    пробуется и поиск с опечатками: для запроса длиной с артикул — до
+    префиксного, для более короткого (скорее недописанного) — только если
+    префиксный ничего не нашёл. Возвращает пару (шаблон сообщения, результаты);
+    результат зависит только от нормализованного артикула.
+    """
+    if transitive:
+        results = search_analogs_transitive(part_number, catalog.wiper_components)
+    else:
+        results = search_analogs_indexed(part_number, catalog.wiper_index)
+    if results:
+        return SEARCH_FOUND, results
+    
+    fuzzy_first = fuzzy and is_full_length_part_number(part_number)
+    if fuzzy_first:
+        fuzzy_results = search_fuzzy_indexed(part_number, catalog.wiper_index)
+        if fuzzy_results:
+            return SEARCH_SIMILAR, fuzzy_results
+    
+    # Если точных совпадений нет, а длина запроса >= 3 — пробуем префиксный поиск
+    if len(part_number.strip()) >= 3:
+        prefix_results = search_by_prefix_indexed(part_number, catalog.wiper_index)
+        if prefix_results:
+            return PREFIX_FOUND, prefix_results
+    
+    if fuzzy and not fuzzy_first:
+        fuzzy_results = search_fuzzy_indexed(part_number, catalog.wiper_index)
+        if fuzzy_results:
+            return SEARCH_SIMILAR, fuzzy_results
+    
+    return SEARCH_NOT_FOUND, []
+
+def brake_pads_search_results(part_number, catalog, fuzzy=False):
+    """Поиск аналогов тормозных колодок: (шаблон сообщения, результаты).
+
+    Без точного совпадения пробуются поиск по префиксу — по всему введённому
+    артикулу, а не по первым 3 символам, — и поиск с опечатками (при fuzzy)
+    в том же порядке, что и для щёток.
+    """
+    index = catalog.brake_pads_index
+    results = search_brake_pads_indexed(part_number, index)
+    if results:
+        return SEARCH_FOUND, results
+    
+    fuzzy_first = fuzzy and is_full_length_part_number(part_number)
+    if fuzzy_first:
+        fuzzy_results = search_brake_pads_fuzzy(part_number, index)
+        if fuzzy_results:
+            return SEARCH_SIMILAR, fuzzy_results
+    
+    prefix_results = search_brake_pads_by_prefix(part_number, index)
+    if prefix_results:
+        return PREFIX_FOUND, prefix_results
+    
+    if fuzzy and not fuzzy_first:
+        fuzzy_results = search_brake_pads_fuzzy(part_number, index)
+        if fuzzy_results:
+            return SEARCH_SIMILAR, fuzzy_results
+    
+    return SEARCH_NOT_FOUND, []
+
+def wipers_search_payload(part_number, catalog, fuzzy=False, transitive=True):
+    """Ответ поиска щёток в виде словаря (для /search-batch)"""
+    template, results = wipers_search_results(part_number, catalog, fuzzy, transitive)
+    return {'message': search_message(template, part_number), 'results': results}
+
+def brake_pads_search_payload(part_number, catalog):
+    """Ответ поиска колодок в виде словаря (для /search-batch)"""
+    template, results = brake_pads_search_results(part_number, catalog)
+    return {'message': search_message(template, part_number, prefix_length=None), 'results': results}
+
+# Метрики каталога и кэша читаются из уже хранимых значений при выводе /metrics
+def catalog_gauge(value):
+    """Функция для Gauge: значение по текущему снимку или None до загрузки"""
+    def read():
+        catalog = catalog_manager.current
+        return None if catalog is None else value(catalog)
+    return read
+
+Gauge('catalog_rows', 'Строк в каталоге', ['family'], function=catalog_gauge(lambda catalog: {
+    ('wipers',): len(catalog.wipers),
+    ('brake_pads',): len(catalog.brake_pads),
+}))
+Gauge('catalog_tokens', 'Артикулов в индексах поиска', ['family'], function=catalog_gauge(lambda catalog: {
+    ('wipers',): len(catalog.wiper_index) if catalog.wiper_index is not None else 0,
+    ('brake_pads',): len(catalog.brake_pads_index) if catalog.brake_pads_index is not None else 0,
+}))
+Gauge('catalog_age_seconds', 'Секунд с последней сверки каталога с таблицей', function=catalog_gauge(
+    lambda catalog: round(catalog.age, 3)
+))
+Gauge('catalog_info', 'Версия текущего каталога', ['version'], function=catalog_gauge(
+    lambda catalog: {(catalog.version,): 1}
+))
+Gauge('catalog_refresh_failures', 'Неудачных обновлений каталога подряд',
+      function=lambda: catalog_manager.breaker.failures)
+Gauge('catalog_circuit_open', 'Размыкатель обновлений из таблицы разомкнут (1) или замкнут (0)',
+      function=lambda: int(catalog_manager.breaker.is_open))
+
+# Кэш результатов свой у каждой версии каталога: счётчики начинаются с нуля
+# при смене версии (для Prometheus это обычный сброс счётчика)
+def result_cache_requests(catalog):
+    stats = catalog.result_cache.stats()
+    return {('hit',): stats['hits'], ('miss',): stats['misses'], ('coalesced',): stats['coalesced']}
+
+Counter('result_cache_requests_total', 'Обращения к кэшу результатов поиска', ['result'],
+        function=catalog_gauge(result_cache_requests))
+Counter('result_cache_evictions_total', 'Вытеснения из кэша результатов поиска',
+        function=catalog_gauge(lambda catalog: catalog.result_cache.stats()['evictions']))
+Gauge('result_cache_entries', 'Записей в кэше результатов поиска',
+      function=catalog_gauge(lambda catalog: catalog.result_cache.stats()['size']))
+
+# Задержка обработки запросов поиска по эндпоинтам (без потоковой выдачи /search-batch)
+SEARCH_ENDPOINTS = {'search', 'search_fuzzy', 'search_prefix', 'search_brake_pads', 'suggest', 'lookup'}
+search_request_seconds = Histogram('search_request_seconds', 'Длительность обработки запросов поиска', ['endpoint'])
+
+# Профилирование доли запросов поиска (PROFILE_SAMPLE_RATE, 0 — выключено);
+# профили сохраняются в PROFILE_DIR и доступны через /admin/profiles
+profiler = SampledProfiler(
+    os.getenv('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'wiper-search-profiles'),
+    sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+    max_dumps=int(os.getenv('PROFILE_MAX_DUMPS', 100)),
+)
+
+@contextmanager
+def server_timing(stage):
+    """Учитывает длительность этапа обработки запроса в заголовке Server-Timing"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = g.get('server_timing')
+        if timings is not None:
+            timings.append((stage, time.perf_counter() - started, None))
+
+def server_timing_note(stage, description):
+    """Метка без длительности в Server-Timing (например, попадание в кэш)"""
+    timings = g.get('server_timing')
+    if timings is not None:
+        timings.append((stage, None, description))
+
+@app.before_request
+def start_request_timer():
+    if request.endpoint in SEARCH_ENDPOINTS:
+        g.request_started = time.perf_counter()
+        g.server_timing = []
+        g.profile = profiler.start()
+
+@app.after_request
+def observe_request_time(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    profile = g.pop('profile', None)
+    search_request_seconds.observe(elapsed, endpoint=request.path)
+    timings = g.pop('server_timing')
+    timings.append(('total', elapsed, None))
+    if profile is not None:
+        try:
+            timings.append(('profile', None, profiler.stop(profile, request.path)))
+        except OSError as e:
+            print(f"Не удалось сохранить профиль запроса: {e}")
+    response.headers['Server-Timing'] = server_timing_header(timings)
+    return response
+
+@app.teardown_request
+def stop_profile(error=None):
+    # Запрос завершился исключением до after_request: профиль не сохраняется
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profiler.discard(profile)
+
+def request_catalog():
+    """Текущий каталог; ожидание первой загрузки попадает в Server-Timing"""
+    with server_timing('catalog'):
+        return catalog_manager.get()
+
+def cached_search_body(catalog, key, part_number, compute, prefix_length=3):
+    """JSON-тело ответа поиска; результаты берутся из кэша или считаются один раз.
+
+    В кэше лежат шаблон сообщения и уже сериализованный список результатов,
+    а сообщение с исходным написанием артикула подставляется для каждого запроса.
+    Тело совпадает с тем, что вернул бы jsonify.
+    """
+    computed = []
+    
+    def compute_entry():
+        computed.append(True)
+        with server_timing('match'):
+            template, results = compute()
+        with server_timing('serialize'):
+            return template, app.json.dumps(results, separators=(',', ':'))
+    
+    template, results_json = catalog.result_cache.get_or_compute(key, compute_entry)
+    server_timing_note('cache', 'miss' if computed else 'hit')
+    message = app.json.dumps(search_message(template, part_number, prefix_length))
+    return f'{{"message":{message},"results":{results_json}}}\n'
+
+def json_body_response(body):
+    """Ответ с готовым JSON-телом"""
+    return app.response_class(body, mimetype=app.json.mimetype)
+
+def request_params():
+    """Параметры запроса: query string для GET, JSON-тело для POST"""
+    if request.method == 'GET':
+        return request.args
+    return request.get_json() or {}
+
+def is_enabled(value):
+    """Булев флаг из JSON (true) или query string (1/true/yes)"""
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+def search_etag(catalog, endpoint, *key_parts):
+    """ETag ответа поиска: версия каталога + хэш нормализованного запроса"""
+    key = '|'.join([endpoint] + [str(part) for part in key_parts])
+    return f'{catalog.version}-{hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]}'
+
+def cacheable_search_response(etag, compute_body):
+    """Ответ поиска с ETag и Cache-Control; 304 без пересчёта при If-None-Match.
+
+    Результат меняется только вместе с версией каталога, но сменить её может
+    push, чужой снимок или восстановление после сбоя в любой момент, поэтому
+    срок свежести не даётся: кэш (браузер, CDN) хранит ответ и перед каждым
+    использованием переспрашивает по ETag, получая дешёвый 304.
+    Для POST заголовки кэширования не ставятся.
+    """
+    if request.method != 'GET':
+        return json_body_response(compute_body())
+    
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = json_body_response(compute_body())
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'public, no-cache'
+    return response
+
+@app.route('/search', methods=['GET', 'POST'])
 def search():
+    try:
+        data = request_params()
+        part_number = preprocess_part_number(data.get('part_number', ''))
+        
+        if not part_number:
+            return jsonify({'error': 'Part number not specified'}), 400
+        
+        mode = data.get('mode', 'transitive')
+        if mode not in ('transitive', 'direct'):
+            return jsonify({'error': 'mode must be "transitive" or "direct"'}), 400
+        fuzzy = is_enabled(data.get('fuzzy'))
+        
+        catalog = request_catalog()
+        if catalog is None or not catalog.wipers:
+            return jsonify({'error': 'Failed to get data from table'}), 500
+        
+        key = ('search', normalize_token_for_match(part_number), mode, fuzzy)
+        etag = search_etag(catalog, *key)
+        return cacheable_search_response(etag, lambda: cached_search_body(
+            catalog,
+            key,
+            part_number,
+            lambda: wipers_search_results(part_number, catalog, fuzzy=fuzzy, transitive=mode == 'transitive')
+        ))
+        
+    except Exception as e:
+        return jsonify({'error': f'Search error: {str(e)}'}), 500
+
+@app.route('/search-fuzzy', methods=['POST'])
+def search_fuzzy():
+    """Поиск аналогов щёток с учётом опечаток (max_distance 1–2, limit артикулов)"""
     try:
         data = request.get_json()
         part_number = preprocess_part_number(data.get('part_number', ''))
@@ -373,100 +1111,251 @@ def search():
         if not part_number:
             return jsonify({'error': 'Part number not specified'}), 400
         
-        raw_data = get_google_sheets_data()
-        if not raw_data:
+        max_distance = data.get('max_distance', 2)
+        limit = data.get('limit', 10)
+        # bool — подкласс int, а 2.0 == 2: проверяем точный тип, иначе True и 2.0 проходят
+        if type(max_distance) is not int or max_distance not in (1, 2):
+            return jsonify({'error': 'max_distance must be 1 or 2'}), 400
+        if type(limit) is not int or limit < 1:
+            return jsonify({'error': 'limit must be a positive integer'}), 400
+        
+        catalog = request_catalog()
+        if catalog is None or not catalog.wipers:
             return jsonify({'error': 'Failed to get data from table'}), 500
         
-        normalized_data = normalize_data(raw_data)
-        results = search_analogs(part_number, normalized_data)
-        
-        # Если точных совпадений нет, а длина запроса >= 3 — пробуем префиксный поиск
-        if not results and len(part_number.strip()) >= 3:
-            prefix_results = search_by_prefix(part_number, normalized_data)
-            if prefix_results:
-                return jsonify({
-                    'message': f'Found results for prefix "{part_number[:3].upper()}":',
-                    'results': prefix_results
-                })
-        
-        if not results:
-            return jsonify({
-                'message': f'Part number "{part_number}" not found in database',
-                'results': []
-            })
+        def compute():
+            results = search_fuzzy_indexed(part_number, catalog.wiper_index, max_distance, limit)
+            return (FUZZY_FOUND if results else FUZZY_NOT_FOUND), results
         
-        return jsonify({
-            'message': f'Found analogs for part number "{part_number}":',
-            'results': results
-        })
+        key = ('search-fuzzy', normalize_token_for_match(part_number), max_distance, limit)
+        return json_body_response(cached_search_body(catalog, key, part_number, compute))
         
     except Exception as e:
         return jsonify({'error': f'Search error: {str(e)}'}), 500
 
 @app.route('/search-prefix', methods=['POST'])
 def search_prefix():
-    """Ищет запчасти по первым 3 символам артикула (case-insensitive)."""
+    """Ищет запчасти по префиксу артикула (case-insensitive).
+
+    По умолчанию учитываются первые 3 символа; prefix_length позволяет взять
+    больше (или весь запрос при null), limit ограничивает число групп.
+    """
     try:
         data = request.get_json()
         part_prefix = preprocess_part_number(data.get('part_prefix', ''))
         if not part_prefix or len(part_prefix.strip()) < 3:
             return jsonify({'error': 'Part prefix must be at least 3 characters'}), 400
         
-        raw_data = get_google_sheets_data()
-        if not raw_data:
+        prefix_length = data.get('prefix_length', 3)
+        limit = data.get('limit')
+        if prefix_length is not None and (type(prefix_length) is not int or prefix_length < 3):
+            return jsonify({'error': 'prefix_length must be an integer >= 3 or null'}), 400
+        if limit is not None and (type(limit) is not int or limit < 1):
+            return jsonify({'error': 'limit must be a positive integer'}), 400
+        
+        catalog = request_catalog()
+        if catalog is None or not catalog.wipers:
             return jsonify({'error': 'Failed to get data from table'}), 500
         
-        normalized_data = normalize_data(raw_data)
-        results = search_by_prefix(part_prefix, normalized_data)
+        def compute():
+            results = search_by_prefix_indexed(part_prefix, catalog.wiper_index, prefix_length, limit)
+            return (PREFIX_FOUND if results else PREFIX_NOT_FOUND), results
         
-        if not results:
-            return jsonify({
-                'message': f'No results for prefix "{part_prefix[:3].upper()}"',
-                'results': []
-            })
+        key = ('search-prefix', normalize_token_for_match(part_prefix), prefix_length, limit)
+        return json_body_response(cached_search_body(catalog, key, part_prefix, compute, prefix_length))
+    except Exception as e:
+        return jsonify({'error': f'Search error: {str(e)}'}), 500
+
+# Максимум подсказок в ответе /suggest
+SUGGEST_MAX_LIMIT = 20
+
+@app.route('/suggest')
+def suggest():
+    """Подсказки артикулов щёток при вводе: ?part_prefix=...&limit=8.
+
+    Возвращает нормализованные артикулы из индекса в лексикографическом
+    порядке; ответ кэшируется по ETag так же, как GET /search.
+    """
+    try:
+        part_prefix = preprocess_part_number(request.args.get('part_prefix', ''))
+        limit = request.args.get('limit', 8, type=int)
+        if not 1 <= limit <= SUGGEST_MAX_LIMIT:
+            return jsonify({'error': f'limit must be an integer from 1 to {SUGGEST_MAX_LIMIT}'}), 400
         
-        return jsonify({
-            'message': f'Found results for prefix "{part_prefix[:3].upper()}":',
-            'results': results
-        })
+        catalog = request_catalog()
+        if catalog is None or not catalog.wipers:
+            return jsonify({'error': 'Failed to get data from table'}), 500
+        
+        prefix = normalize_token_for_match(part_prefix)
+        
+        def compute_body():
+            with server_timing('match'):
+                suggestions = suggest_part_numbers(prefix, catalog.wiper_index, limit)
+            return app.json.dumps({'query': prefix, 'suggestions': suggestions}, separators=(',', ':')) + '\n'
+        
+        etag = search_etag(catalog, 'suggest', prefix, limit)
+        return cacheable_search_response(etag, compute_body)
     except Exception as e:
         return jsonify({'error': f'Search error: {str(e)}'}), 500
 
-@app.route('/search-brake-pads', methods=['POST'])
+@app.route('/search-brake-pads', methods=['GET', 'POST'])
 def search_brake_pads():
     """API endpoint для поиска аналогов тормозных колодок"""
     try:
-        data = request.get_json()
+        data = request_params()
         part_number = preprocess_part_number(data.get('part_number', ''))
         
         if not part_number:
             return jsonify({'error': 'Part number not specified'}), 400
+        fuzzy = is_enabled(data.get('fuzzy'))
         
-        # Получаем данные из Google Sheets
-        raw_data = get_brake_pads_data()
-        if not raw_data:
+        # Берём нормализованные данные из кэша каталога
+        catalog = request_catalog()
+        if catalog is None or not catalog.brake_pads:
             return jsonify({'error': 'Failed to get data from table'}), 500
         
-        # Нормализуем данные
-        normalized_data = normalize_brake_pads_data(raw_data)
+        key = ('search-brake-pads', normalize_token_for_match(part_number), fuzzy)
+        etag = search_etag(catalog, *key)
+        return cacheable_search_response(etag, lambda: cached_search_body(
+            catalog,
+            key,
+            part_number,
+            lambda: brake_pads_search_results(part_number, catalog, fuzzy=fuzzy),
+            prefix_length=None
+        ))
         
-        # Ищем аналоги
-        results = search_brake_pads_analogs(part_number, normalized_data)
+    except Exception as e:
+        return jsonify({'error': f'Search error: {str(e)}'}), 500
+
+@app.route('/lookup', methods=['GET', 'POST'])
+def lookup():
+    """Поиск артикула одновременно в щётках и колодках по общему индексу.
+
+    Каждый результат помечен семейством (family) и секцией; параметры family
+    (wipers, brake-pads или оба через запятую) и section ограничивают выдачу.
+    Щётки отдаются прямыми группами по main_part, как /search с mode=direct,
+    а не транзитивными группами /search по умолчанию.
+    """
+    try:
+        data = request_params()
+        part_number = preprocess_part_number(data.get('part_number', ''))
         
-        if not results:
-            return jsonify({
-                'message': f'Part number "{part_number}" not found in database',
-                'results': []
-            })
+        if not part_number:
+            return jsonify({'error': 'Part number not specified'}), 400
         
-        return jsonify({
-            'message': f'Found analogs for part number "{part_number}":',
-            'results': results
-        })
+        family = data.get('family') or ','.join(LOOKUP_FAMILIES)
+        if isinstance(family, str):
+            family = family.split(',')
+        if not isinstance(family, list) or not all(isinstance(name, str) for name in family):
+            return jsonify({'error': f'family must be one of: {", ".join(LOOKUP_FAMILIES)}'}), 400
+        families = tuple(sorted({name.strip().lower() for name in family}))
+        if not families or not set(families) <= set(LOOKUP_FAMILIES):
+            return jsonify({'error': f'family must be one of: {", ".join(LOOKUP_FAMILIES)}'}), 400
+        section = data.get('section') or ''
+        if not isinstance(section, str):
+            return jsonify({'error': 'section must be a string'}), 400
+        section = section.strip().lower() or None
+        
+        catalog = request_catalog()
+        if catalog is None or catalog.lookup_index is None:
+            return jsonify({'error': 'Failed to get data from table'}), 500
+        
+        key = ('lookup', normalize_token_for_match(part_number), families, section)
+        etag = search_etag(catalog, *key)
+        return cacheable_search_response(etag, lambda: cached_search_body(
+            catalog,
+            key,
+            part_number,
+            lambda: lookup_part_number(part_number, catalog.lookup_index, families, section),
+            prefix_length=None
+        ))
         
     except Exception as e:
         return jsonify({'error': f'Search error: {str(e)}'}), 500
 
+# Типы каталогов для массового поиска и функции поиска по ним
+BATCH_SEARCHES = {
+    'wipers': ('wipers', wipers_search_payload),
+    'brake-pads': ('brake_pads', brake_pads_search_payload),
+}
+
+def batch_items():
+    """Артикулы из тела запроса /search-batch: итератор пар (part_number, type или None).
+
+    Поддерживается JSON (массив строк или объектов {"part_number", "type"}, либо
+    объект {"part_numbers": [...]}) и CSV (файл в поле file или тело text/csv)
+    с колонками part_number[,type]. JSON разбирается целиком и проверяется до
+    начала ответа (ValueError — тело не подходит); CSV читается построчно, без
+    загрузки целиком, поэтому длинные списки лучше отправлять в CSV.
+    """
+    if request.is_json:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('part_numbers')
+        if not isinstance(data, list):
+            raise ValueError('Expected a JSON array of part numbers or {"part_numbers": [...]}')
+        return (
+            (item.get('part_number', ''), item.get('type')) if isinstance(item, dict) else (item, None)
+            for item in data
+        )
+    
+    upload = request.files.get('file')
+    stream = upload.stream if upload is not None else request.stream
+    return iter_csv_batch_items(stream)
+
+def iter_csv_batch_items(stream):
+    """Пары (part_number, type или None) из CSV, построчно"""
+    for row_number, row in enumerate(csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))):
+        if not row or not row[0].strip():
+            continue
+        if row_number == 0 and row[0].strip().lower() in ('part_number', 'part number'):
+            continue
+        yield row[0], row[1].strip() if len(row) > 1 and row[1].strip() else None
+
+@app.route('/search-batch', methods=['POST'])
+def search_batch():
+    """Массовый поиск аналогов: по одной строке NDJSON на каждый входной артикул.
+
+    Тип каталога по умолчанию задаётся параметром ?type=wipers|brake-pads и может
+    быть переопределён для отдельного артикула. Для каждого артикула работает та
+    же логика, что в /search и /search-brake-pads; результаты отдаются потоком.
+    Неверный JSON (или не массив) отклоняется с 400 до начала ответа.
+    """
+    default_type = request.args.get('type', 'wipers').replace('_', '-')
+    if default_type not in BATCH_SEARCHES:
+        return jsonify({'error': 'type must be "wipers" or "brake-pads"'}), 400
+    
+    try:
+        items = batch_items()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    catalog = catalog_manager.get()
+    if catalog is None:
+        return jsonify({'error': 'Failed to get data from table'}), 500
+    
+    def generate():
+        try:
+            for raw_part_number, search_type in items:
+                search_type = str(search_type or default_type).replace('_', '-')
+                line = {'part_number': raw_part_number, 'type': search_type}
+                part_number = preprocess_part_number(raw_part_number)
+                if search_type not in BATCH_SEARCHES:
+                    line['error'] = 'type must be "wipers" or "brake-pads"'
+                elif not part_number:
+                    line['error'] = 'Part number not specified'
+                else:
+                    data_name, search_payload = BATCH_SEARCHES[search_type]
+                    if not getattr(catalog, data_name):
+                        line['error'] = 'Failed to get data from table'
+                    else:
+                        line.update(search_payload(part_number, catalog))
+                yield json.dumps(line, ensure_ascii=False) + '\n'
+        except Exception as e:
+            yield json.dumps({'error': f'Search error: {str(e)}'}, ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/health')
 def health():
     """Проверка состояния приложения"""
@@ -477,17 +1366,152 @@ def health():
             'GOOGLE_SERVICE_ACCOUNT_KEY': bool(os.getenv('GOOGLE_SERVICE_ACCOUNT_KEY'))
         }
         
+        # degraded: поиск работает по последнему удачному снимку, пока таблица недоступна
+        state = catalog_manager.state
+        catalog = catalog_manager.current
         return jsonify({
-            'status': 'ok',
+            'status': state,
             'environment_variables': env_status,
+            'catalog': catalog_manager.status(),
+            'result_cache': None if catalog is None else dict(catalog.result_cache.stats(), version=catalog.version),
             'message': 'Application is running'
-        })
+        }), 503 if state == 'unavailable' else 200
     except Exception as e:
         return jsonify({
             'status': 'error',
             'error': str(e)
         }), 500
 
+@app.route('/metrics')
+def metrics():
+    """Метрики процесса в текстовом формате Prometheus"""
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+def admin_required(view):
+    """Доступ только с заголовком Authorization: Bearer <ADMIN_TOKEN>.
+
+    Без ADMIN_TOKEN в окружении административные эндпоинты отключены (404).
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = os.getenv('ADMIN_TOKEN')
+        if not token:
+            return jsonify({'error': 'Not found'}), 404
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.route('/admin/profiling', methods=['GET', 'POST'])
+@admin_required
+def admin_profiling():
+    """Доля профилируемых запросов в этом воркере: чтение и изменение (sample_rate 0..1)"""
+    if request.method == 'POST':
+        sample_rate = (request.get_json(silent=True) or {}).get('sample_rate')
+        if isinstance(sample_rate, bool) or not isinstance(sample_rate, (int, float)) or not 0 <= sample_rate <= 1:
+            return jsonify({'error': 'sample_rate must be a number from 0 to 1'}), 400
+        profiler.sample_rate = float(sample_rate)
+    return jsonify({
+        'pid': os.getpid(),
+        'sample_rate': profiler.sample_rate,
+        'directory': profiler.directory,
+        'max_dumps': profiler.max_dumps,
+    })
+
+@app.route('/admin/profiles')
+@admin_required
+def admin_profiles():
+    """Список сохранённых профилей (от новых к старым)"""
+    return jsonify({'profiles': profiler.dumps()})
+
+def profile_report_response(names):
+    """Текстовый отчёт pstats: ?sort= (по умолчанию cumulative) и ?limit= строк"""
+    sort = request.args.get('sort', 'cumulative')
+    try:
+        limit = int(request.args.get('limit', 40))
+        report = profiler.report(names, sort, limit)
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Invalid sort or limit'}), 400
+    if report is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return Response(report, mimetype='text/plain')
+
+@app.route('/admin/profiles/summary')
+@admin_required
+def admin_profiles_summary():
+    """Суммарный отчёт по последним ?count= профилям (по умолчанию по всем)"""
+    dumps = profiler.dumps()
+    count = request.args.get('count', type=int)
+    if count is not None:
+        dumps = dumps[:count]
+    return profile_report_response([dump['name'] for dump in dumps])
+
+@app.route('/admin/profiles/<name>')
+@admin_required
+def admin_profile(name):
+    """Профиль запроса: файл pstats (.prof) или текстовый отчёт при ?format=text"""
+    if request.args.get('format') == 'text':
+        return profile_report_response([name])
+    path = profiler.path(name)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=name)
+
+# Push-обновление каталога по правкам в таблице (триггер Apps Script):
+# тело подписывается HMAC-SHA256 с секретом REFRESH_WEBHOOK_SECRET, метка
+# времени в теле ограничивает повтор перехваченного запроса
+REFRESH_SIGNATURE_PREFIX = 'sha256='
+REFRESH_MAX_SKEW_SECONDS = 300
+refresh_requests_total = Counter('catalog_refresh_requests_total', 'Запросы /admin/refresh по результату', ['result'])
+
+def refresh_signature(secret, body):
+    """Подпись тела запроса /admin/refresh: hex HMAC-SHA256"""
+    return hmac.new(secret.encode('utf-8'), body, 'sha256').hexdigest()
+
+@app.route('/admin/refresh', methods=['POST'])
+def admin_refresh():
+    """Ставит в очередь обновление каталога: {"sheet": <лист или null>, "timestamp": <unix>}.
+
+    Заголовок X-Signature: sha256=<hex HMAC-SHA256 тела>. Без sheet
+    перечитывается вся таблица. Ответ 202 не ждёт загрузки: правки, пришедшие
+    подряд, объединяются в одну пересборку каталога.
+    """
+    secret = os.getenv('REFRESH_WEBHOOK_SECRET')
+    if not secret:
+        return jsonify({'error': 'Not found'}), 404
+    body = request.get_data(cache=False)
+    supplied = request.headers.get('X-Signature', '')
+    expected = REFRESH_SIGNATURE_PREFIX + refresh_signature(secret, body)
+    if not hmac.compare_digest(supplied.encode('utf-8'), expected.encode('utf-8')):
+        refresh_requests_total.inc(result='unauthorized')
+        return jsonify({'error': 'Invalid signature'}), 401
+    
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        refresh_requests_total.inc(result='invalid')
+        return jsonify({'error': 'Invalid JSON'}), 400
+    timestamp = payload.get('timestamp')
+    if isinstance(timestamp, bool) or not isinstance(timestamp, (int, float)) or abs(time.time() - timestamp) > REFRESH_MAX_SKEW_SECONDS:
+        refresh_requests_total.inc(result='expired')
+        return jsonify({'error': 'Missing or expired timestamp'}), 401
+    sheet = payload.get('sheet')
+    if sheet is not None and (not isinstance(sheet, str) or not sheet):
+        refresh_requests_total.inc(result='invalid')
+        return jsonify({'error': 'sheet must be a non-empty string'}), 400
+    
+    pending = catalog_manager.request_refresh(None if sheet is None else [sheet])
+    refresh_requests_total.inc(result='queued')
+    return jsonify({
+        'status': 'queued',
+        'sheet': sheet,
+        'pending_requests': pending,
+        'version': catalog_manager.version,
+    }), 202
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8000))
     app.run(debug=False, host='0.0.0.0', port=port)
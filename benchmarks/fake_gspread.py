@@ -0,0 +1,88 @@
+"""
+Офлайн-замена клиента gspread для бенчмарков.
+
+FakeClient отвечает на те же запросы, что делает sheets.fetch_worksheets
+(метаданные листов и values:batchGet) и sheets.fetch_modified_time, данными из
+списка (название листа, строки). Ответ batchGet повторяет поведение Sheets API:
+пустые хвосты строк и пустые строки в конце диапазона отбрасываются, колонки
+обрезаются по запрошенному диапазону.
+"""
+
+import os
+
+import sheets
+
+# Колонки диапазона A:B / A:C -> число колонок
+RANGE_WIDTHS = {'A:B': 2, 'A:C': 3}
+
+
+def value_range(worksheets, range_name):
+    """Ответ values:batchGet для одного диапазона вида 'Лист'!A:B"""
+    title, columns = range_name.rsplit('!', 1)
+    title = title[1:-1].replace("''", "'")
+    width = RANGE_WIDTHS[columns]
+    values = []
+    for row in worksheets[title]:
+        row = list(row[:width])
+        while row and not row[-1]:
+            row.pop()
+        values.append(row)
+    while values and not values[-1]:
+        values.pop()
+    result = {'range': range_name, 'majorDimension': 'ROWS'}
+    if values:
+        result['values'] = values
+    return result
+
+
+def spreadsheet_metadata(worksheets):
+    """Ответ spreadsheets.get с полем sheets.properties.title"""
+    return {'sheets': [{'properties': {'title': title}} for title in worksheets]}
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self._data = data
+        self.status_code = 200
+        self.ok = True
+
+    def json(self):
+        return self._data
+
+
+class FakeClient:
+    """Клиент с интерфейсом gspread.Client, который читает листы из памяти"""
+
+    def __init__(self, worksheets, modified_time='2024-01-01T00:00:00.000Z'):
+        self.worksheets = dict(worksheets)
+        self.modified_time = modified_time
+        self.calls = []
+
+    def request(self, method, endpoint, params=None, **kwargs):
+        self.calls.append((method, endpoint))
+        if endpoint.endswith('/values:batchGet'):
+            return FakeResponse({'valueRanges': [value_range(self.worksheets, name) for name in params['ranges']]})
+        return FakeResponse(spreadsheet_metadata(self.worksheets))
+
+    def get_file_drive_metadata(self, spreadsheet_id):
+        self.calls.append(('get', 'drive'))
+        return {'modifiedTime': self.modified_time}
+
+
+class FakeClientHolder:
+    def __init__(self, client):
+        self.client = client
+
+    def get(self):
+        return self.client
+
+    def reset(self):
+        pass
+
+
+def install(worksheets, modified_time='2024-01-01T00:00:00.000Z'):
+    """Подменяет клиента в модуле sheets и возвращает FakeClient"""
+    client = FakeClient(worksheets, modified_time)
+    sheets.client_holder = FakeClientHolder(client)
+    os.environ.setdefault('GOOGLE_SHEETS_ID', 'benchmark')
+    return client
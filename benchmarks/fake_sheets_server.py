@@ -0,0 +1,176 @@
+"""
+Локальный HTTP-сервер, имитирующий Google Sheets v4, Drive v3 и OAuth.
+
+Отвечает на запросы, которые делает приложение: spreadsheets.get (названия
+листов), values:batchGet, files.get (modifiedTime) и обмен JWT сервисного
+аккаунта на access token. Задержка ответа и доля ответов 429 настраиваются,
+чтобы проверить поведение приложения при медленном API и исчерпанной квоте.
+
+Приложение направляется на сервер переменными окружения:
+GOOGLE_API_BASE_URL=http://127.0.0.1:<port> и ключом сервисного аккаунта с
+token_uri=http://127.0.0.1:<port>/token (см. fake_service_account_key).
+
+    python -m benchmarks.fake_sheets_server --rows 20000 --latency-ms 150 --rate-429 0.05
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks import synthetic
+from benchmarks.fake_gspread import spreadsheet_metadata, value_range
+
+SPREADSHEET_ID = 'fake-spreadsheet'
+
+
+def fake_service_account_key(token_uri):
+    """JSON ключа сервисного аккаунта с новым RSA-ключом и заданным token_uri"""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    ).decode('ascii')
+    return json.dumps({
+        'type': 'service_account',
+        'project_id': 'fake-project',
+        'private_key_id': 'fake-key',
+        'private_key': pem,
+        'client_email': 'loadtest@fake-project.iam.gserviceaccount.com',
+        'client_id': '0',
+        'token_uri': token_uri,
+    })
+
+
+class FakeSheetsState:
+    """Данные и настройки сервера, общие для всех потоков обработки"""
+
+    def __init__(self, worksheets, latency_ms=0.0, jitter_ms=0.0, rate_429=0.0, seed=1):
+        self.worksheets = dict(worksheets)
+        self.modified_time = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.throttled = 0
+
+    def record(self, kind):
+        """Учитывает запрос; True, если на него нужно ответить 429"""
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            throttle = kind != 'token' and self._random.random() < self.rate_429
+            if throttle:
+                self.throttled += 1
+            delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        return throttle, max(0.0, delay) / 1000
+
+    def stats(self):
+        with self._lock:
+            return {'requests': dict(self.requests), 'throttled': self.throttled}
+
+
+class FakeSheetsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        path = url.path
+        if path.startswith('/drive/v3/files/'):
+            self._respond('drive', lambda: {
+                'id': path.rsplit('/', 1)[1],
+                'name': 'Fake catalog',
+                'modifiedTime': self.state.modified_time,
+            })
+        elif path.startswith('/v4/spreadsheets/') and path.endswith('/values:batchGet'):
+            self._respond('batchGet', lambda: {
+                'spreadsheetId': path.split('/')[3],
+                'valueRanges': [value_range(self.state.worksheets, name) for name in params.get('ranges', [])],
+            })
+        elif path.startswith('/v4/spreadsheets/'):
+            self._respond('metadata', lambda: spreadsheet_metadata(self.state.worksheets))
+        else:
+            self._send(404, {'error': {'code': 404, 'message': 'Not found', 'status': 'NOT_FOUND'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        if urlsplit(self.path).path == '/token':
+            self._respond('token', lambda: {'access_token': 'fake-token', 'expires_in': 3600, 'token_type': 'Bearer'})
+        else:
+            self._send(404, {'error': {'code': 404, 'message': 'Not found', 'status': 'NOT_FOUND'}})
+
+    def _respond(self, kind, build):
+        throttle, delay = self.state.record(kind)
+        if delay:
+            time.sleep(delay)
+        if throttle:
+            self._send(429, {'error': {
+                'code': 429,
+                'message': 'Quota exceeded for quota metric \'Read requests\'',
+                'status': 'RESOURCE_EXHAUSTED',
+            }})
+            return
+        self._send(200, build())
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(state, host='127.0.0.1', port=0):
+    """Запускает сервер в фоновом потоке и возвращает его (адрес — server.server_address)"""
+    handler = type('BoundFakeSheetsHandler', (FakeSheetsHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-sheets', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help='строк в синтетическом листе щёток')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='задержка каждого ответа API')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='разброс задержки ±')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='доля запросов с ответом 429 (0..1)')
+    args = parser.parse_args()
+
+    state = FakeSheetsState(synthetic.worksheets(args.rows), args.latency_ms, args.jitter_ms, args.rate_429)
+    server = serve(state, args.host, args.port)
+    base_url = f'http://{args.host}:{server.server_address[1]}'
+    with open('fake_service_account.json', 'w') as f:
+        f.write(fake_service_account_key(f'{base_url}/token'))
+    print(f'Имитация Google API на {base_url}. Для приложения:')
+    print(f'  export GOOGLE_API_BASE_URL={base_url}')
+    print(f'  export GOOGLE_SHEETS_ID={SPREADSHEET_ID}')
+    print('  export GOOGLE_SERVICE_ACCOUNT_KEY="$(cat fake_service_account.json)"')
+    try:
+        while True:
+            time.sleep(60)
+            print(json.dumps(state.stats()))
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""
+Нагрузочный тест gunicorn с app:app против локальной имитации Google Sheets API.
+
+Поднимает benchmarks.fake_sheets_server с синтетическим каталогом, затем для
+каждой комбинации числа воркеров и потоков запускает
+`gunicorn -c gunicorn.conf.py -k gthread` и в течение --duration секунд
+отправляет запросы к /search, /search-prefix и /search-brake-pads. Артикулы
+выбираются по закону Ципфа: небольшая часть популярных номеров даёт
+большинство запросов, как в магазинах. Нагрузку создают несколько процессов
+с потоками-клиентами на keep-alive соединениях.
+
+Для каждого запуска выводятся p50/p95/p99 задержки, пропускная способность и
+ошибки по эндпоинтам, а также число запросов к имитации API и ответов 429.
+
+    python -m benchmarks.load --rows 20000 --workers 1 2 4 --threads 1 8 --clients 32
+    python -m benchmarks.load --latency-ms 300 --rate-429 0.2 --ttl 5
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+
+from benchmarks import fake_sheets_server, synthetic
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Доля запросов по эндпоинтам
+ENDPOINT_WEIGHTS = {'search': 0.7, 'search-prefix': 0.15, 'search-brake-pads': 0.15}
+
+
+def catalog_queries(worksheets):
+    """Артикулы из листов: щётки (основные и аналоги) и колодки"""
+    wipers = []
+    brake_pads = []
+    for title, rows in worksheets:
+        for row in rows[1:]:
+            if not row or not row[0] or not any(ch.isdigit() for ch in row[0]):
+                continue
+            if 'wiper' in title.lower():
+                wipers.append(row[0])
+                wipers.extend(part.strip() for part in row[1].replace('/', ',').split(',')[:2] if part.strip())
+            else:
+                brake_pads.append(row[0])
+    return wipers, brake_pads
+
+
+def zipf_weights(count, exponent):
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def request_for(endpoint, part_number):
+    """(method, path, body) для запроса к эндпоинту"""
+    if endpoint == 'search-prefix':
+        return 'POST', '/search-prefix', json.dumps({'part_prefix': part_number})
+    query = urllib.parse.urlencode({'part_number': part_number})
+    return 'GET', f'/{endpoint}?{query}', None
+
+
+def client_process(port, threads, duration, wipers, brake_pads, exponent, seed):
+    """Процесс нагрузки: threads клиентов, каждый на своём соединении"""
+    import threading
+
+    wiper_weights = zipf_weights(len(wipers), exponent)
+    pad_weights = zipf_weights(len(brake_pads), exponent)
+    endpoints = list(ENDPOINT_WEIGHTS)
+    endpoint_weights = list(accumulate(ENDPOINT_WEIGHTS.values()))
+    deadline = time.monotonic() + duration
+    samples = []
+    lock = threading.Lock()
+
+    def client(client_seed):
+        rng = random.Random(client_seed)
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        local = []
+        while time.monotonic() < deadline:
+            endpoint = rng.choices(endpoints, cum_weights=endpoint_weights)[0]
+            if endpoint == 'search-brake-pads':
+                part = rng.choices(brake_pads, cum_weights=pad_weights)[0]
+            else:
+                part = rng.choices(wipers, cum_weights=wiper_weights)[0]
+            method, path, body = request_for(endpoint, part)
+            headers = {'Content-Type': 'application/json'} if body else {}
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                status = 0
+            local.append((endpoint, time.perf_counter() - started, status))
+        connection.close()
+        with lock:
+            samples.extend(local)
+
+    workers = [threading.Thread(target=client, args=(seed * 1000 + i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return samples
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, duration):
+    """p50/p95/p99 (мс), запросов в секунду и ошибки — всего и по эндпоинтам"""
+    groups = {'all': samples}
+    for endpoint in ENDPOINT_WEIGHTS:
+        groups[endpoint] = [sample for sample in samples if sample[0] == endpoint]
+    summary = {}
+    for name, group in groups.items():
+        latencies = sorted(sample[1] * 1000 for sample in group)
+        summary[name] = {
+            'requests': len(group),
+            'rps': round(len(group) / duration, 1),
+            'errors': sum(1 for sample in group if sample[2] != 200),
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+        }
+    return summary
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port, process, timeout=300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn завершился при запуске')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/health')
+            health = json.loads(connection.getresponse().read())
+            connection.close()
+            if health['catalog']['loaded']:
+                return
+        except (OSError, ValueError, KeyError, http.client.HTTPException):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('gunicorn не загрузил каталог вовремя')
+
+
+def run(args, env, workers, threads, wipers, brake_pads):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-k', 'gthread',
+         '-w', str(workers), '--threads', str(threads), '-b', f'127.0.0.1:{port}', 'app:app'],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(port, process)
+        processes = max(1, min(args.client_processes, args.clients))
+        per_process = [args.clients // processes + (1 if i < args.clients % processes else 0) for i in range(processes)]
+        with ProcessPoolExecutor(processes) as pool:
+            futures = [
+                pool.submit(client_process, port, count, args.duration, wipers, brake_pads, args.zipf, i + 1)
+                for i, count in enumerate(per_process)
+            ]
+            samples = [sample for future in futures for sample in future.result()]
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return summarize(samples, args.duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help='строк в синтетическом листе щёток')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='воркеров gunicorn')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8], help='потоков в воркере (gthread)')
+    parser.add_argument('--clients', type=int, default=32, help='одновременных клиентов')
+    parser.add_argument('--client-processes', type=int, default=4, help='процессов, создающих нагрузку')
+    parser.add_argument('--duration', type=float, default=15.0, help='секунд нагрузки на каждый запуск')
+    parser.add_argument('--zipf', type=float, default=1.1, help='показатель распределения Ципфа для артикулов')
+    parser.add_argument('--latency-ms', type=float, default=100.0, help='задержка ответов имитации API')
+    parser.add_argument('--jitter-ms', type=float, default=30.0, help='разброс задержки ±')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='доля ответов 429 от имитации API')
+    parser.add_argument('--ttl', type=float, default=30.0, help='CATALOG_TTL_SECONDS приложения')
+    parser.add_argument('--output', help='записать результаты в JSON-файл')
+    args = parser.parse_args()
+
+    worksheets = synthetic.worksheets(args.rows)
+    wipers, brake_pads = catalog_queries(worksheets)
+    # Популярность не зависит от порядка строк в таблице
+    random.Random(7).shuffle(wipers)
+    random.Random(8).shuffle(brake_pads)
+
+    state = fake_sheets_server.FakeSheetsState(worksheets, args.latency_ms, args.jitter_ms, args.rate_429)
+    server = fake_sheets_server.serve(state)
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    env = dict(
+        os.environ,
+        GOOGLE_API_BASE_URL=base_url,
+        GOOGLE_SHEETS_ID=fake_sheets_server.SPREADSHEET_ID,
+        GOOGLE_SERVICE_ACCOUNT_KEY=fake_sheets_server.fake_service_account_key(f'{base_url}/token'),
+        CATALOG_SNAPSHOT_PATH='',
+        CATALOG_TTL_SECONDS=str(args.ttl),
+    )
+
+    results = []
+    print(f"{'workers':>7} {'threads':>7} {'endpoint':<18} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'errors':>6}")
+    for workers in args.workers:
+        for threads in args.threads:
+            before = state.stats()
+            summary = run(args, env, workers, threads, wipers, brake_pads)
+            after = state.stats()
+            api_requests = sum(after['requests'].values()) - sum(before['requests'].values())
+            results.append({
+                'workers': workers,
+                'threads': threads,
+                'summary': summary,
+                'api_requests': api_requests,
+                'api_throttled': after['throttled'] - before['throttled'],
+            })
+            for endpoint, row in summary.items():
+                print(f"{workers:>7} {threads:>7} {endpoint:<18} {row['rps']:>8} {row['p50_ms']:>8} "
+                      f"{row['p95_ms']:>8} {row['p99_ms']:>8} {row['errors']:>6}")
+            print(f"{'':>16}запросов к API: {api_requests}, из них 429: {after['throttled'] - before['throttled']}")
+
+    server.shutdown()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
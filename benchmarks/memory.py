@@ -0,0 +1,79 @@
+"""
+Память нормализованного каталога: CompactTable против прежнего списка словарей.
+
+Разбирает синтетические листы щёток и колодок, нормализует их и
+сравнивает память (tracemalloc), размер снимка pickle и время полного прохода
+по строкам. Google Sheets не нужен.
+
+    python -m benchmarks.memory --rows 200000
+"""
+
+import argparse
+import gc
+import os
+import pickle
+import time
+import tracemalloc
+
+os.environ.setdefault('CATALOG_SNAPSHOT_PATH', '')
+
+import app  # noqa: E402
+from benchmarks import synthetic  # noqa: E402
+
+
+def measure(build):
+    """Память (МБ), которую удерживает результат build(), и сам результат"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return current / 1024 / 1024, result
+
+
+def scan_seconds(data):
+    """Время полного прохода по строкам с чтением всех полей"""
+    started = time.perf_counter()
+    for item in data:
+        item['main_part'], item['alt_part'], item.get('section', 'Unknown')
+    return time.perf_counter() - started
+
+
+def compare(name, raw, normalize):
+    compact_mb, compact = measure(lambda: normalize(raw))
+    # Прежняя структура: по словарю на пару (main, alt) с копиями общих полей
+    dicts_mb, dicts = measure(lambda: [dict(item) for item in normalize(raw)])
+    return {
+        'name': name,
+        'rows': len(compact),
+        'dicts_mb': dicts_mb,
+        'compact_mb': compact_mb,
+        'dicts_pickle_mb': len(pickle.dumps(dicts, protocol=5)) / 1024 / 1024,
+        'compact_pickle_mb': len(pickle.dumps(compact, protocol=5)) / 1024 / 1024,
+        'dicts_scan_s': scan_seconds(dicts),
+        'compact_scan_s': scan_seconds(compact),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000, help='строк в синтетических листах щёток и колодок')
+    args = parser.parse_args()
+
+    raw_wipers, raw_brake_pads = app.parse_worksheets(synthetic.worksheets(args.rows, args.rows))
+    results = [
+        compare('wipers', raw_wipers, app.normalize_data),
+        compare('brake_pads', raw_brake_pads, app.normalize_brake_pads_data),
+    ]
+
+    print(f"{'catalog':<11} {'rows':>8} {'dicts MB':>9} {'compact MB':>10} {'ratio':>6} "
+          f"{'pickle dicts':>12} {'pickle compact':>14} {'scan dicts':>10} {'scan compact':>12}")
+    for r in results:
+        print(f"{r['name']:<11} {r['rows']:>8} {r['dicts_mb']:>9.1f} {r['compact_mb']:>10.1f} "
+              f"{r['dicts_mb'] / r['compact_mb']:>5.1f}x {r['dicts_pickle_mb']:>12.1f} "
+              f"{r['compact_pickle_mb']:>14.1f} {r['dicts_scan_s']:>9.2f}s {r['compact_scan_s']:>11.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Замер памяти воркеров gunicorn с общим (preload) и собственным каталогом.
+
+Строит синтетический каталог, сохраняет его снимком на диск и запускает
+`gunicorn -c gunicorn.conf.py app:app` с 1 и N воркерами, с CATALOG_PRELOAD
+и без него. Для каждого запуска выводит RSS, PSS и приватную память воркеров
+из /proc/<pid>/smaps_rollup (только Linux). Google Sheets не нужен.
+
+    python -m benchmarks.memory_rss --rows 200000 --workers 1 4
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_SOURCE = 'rss-benchmark'
+
+
+def synthetic_raw_wipers(rows, seed=1):
+    """Сырые строки листа щёток: основной артикул и 3-8 аналогов"""
+    rng = random.Random(seed)
+    alphabet = 'ABCDEFGHJKLMNPRSTVWXYZ0123456789'
+
+    def part():
+        return ''.join(rng.choice(alphabet) for _ in range(rng.randint(6, 10)))
+
+    return [
+        {
+            'main_part': part(),
+            'alt_parts': ', '.join(part() for _ in range(rng.randint(3, 8))),
+            'section': 'Front Wipers' if i % 3 else 'Back Wipers',
+        }
+        for i in range(rows)
+    ]
+
+
+def build_snapshot(path, rows):
+    """Сохраняет синтетический каталог снимком в path, возвращает пример артикулов"""
+    os.environ['CATALOG_SNAPSHOT_PATH'] = ''
+    import app
+    from catalog import save_snapshot
+
+    raw_wipers = synthetic_raw_wipers(rows)
+    wipers = app.normalize_data(raw_wipers)
+    catalog = app.build_catalog(app.catalog_version(raw_wipers), wipers, [])
+    save_snapshot(catalog, path, SNAPSHOT_SOURCE)
+    return [item['alt_part'] for item in wipers[::max(1, len(wipers) // 200)]]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def read_memory(pid):
+    """Rss/Pss/Private из smaps_rollup в мегабайтах"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        'rss': values.get('Rss', 0),
+        'pss': values.get('Pss', 0),
+        'private': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0),
+    }
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def wait_ready(port, workers, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=5) as response:
+                if json.load(response)['catalog']['loaded']:
+                    return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('gunicorn не поднялся вовремя')
+
+
+def run(snapshot_path, workers, preload, queries):
+    port = free_port()
+    env = dict(
+        os.environ,
+        CATALOG_SNAPSHOT_PATH=snapshot_path,
+        CATALOG_PRELOAD='1' if preload else '0',
+        CATALOG_TTL_SECONDS='86400',
+        GOOGLE_SHEETS_ID=SNAPSHOT_SOURCE,
+        GOOGLE_SERVICE_ACCOUNT_KEY='',
+    )
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '-w', str(workers), '-b', f'127.0.0.1:{port}', 'app:app'],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(port, workers)
+        # Прогрев: запросы расходятся по всем воркерам и трогают индекс
+        for query in queries * workers:
+            request = urllib.request.Request(
+                f'http://127.0.0.1:{port}/search',
+                data=json.dumps({'part_number': query}).encode('utf-8'),
+                headers={'Content-Type': 'application/json'},
+            )
+            urllib.request.urlopen(request, timeout=30).read()
+        time.sleep(1)
+        worker_memory = [read_memory(pid) for pid in children(process.pid)]
+        master_memory = read_memory(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    return {
+        'workers': workers,
+        'preload': preload,
+        'master_rss_mb': round(master_memory['rss'], 1),
+        'worker_rss_mb': round(sum(m['rss'] for m in worker_memory) / len(worker_memory), 1),
+        'worker_private_mb': round(sum(m['private'] for m in worker_memory) / len(worker_memory), 1),
+        'total_pss_mb': round(master_memory['pss'] + sum(m['pss'] for m in worker_memory), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000, help='строк в синтетическом листе щёток')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4], help='число воркеров для замеров')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, 'catalog_snapshot.pickle')
+        queries = build_snapshot(snapshot_path, args.rows)
+        print(f"Снимок: {os.path.getsize(snapshot_path) / 1024 / 1024:.1f} МБ, {args.rows} строк")
+        print(f"{'workers':>7} {'preload':>7} {'master RSS':>10} {'worker RSS':>10} {'private':>8} {'total PSS':>9}")
+        for workers in args.workers:
+            for preload in (False, True):
+                result = run(snapshot_path, workers, preload, queries)
+                print(f"{result['workers']:>7} {str(result['preload']):>7} {result['master_rss_mb']:>10} "
+                      f"{result['worker_rss_mb']:>10} {result['worker_private_mb']:>8} {result['total_pss_mb']:>9}")
+
+
+if __name__ == '__main__':
+    main()
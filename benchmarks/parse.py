@@ -0,0 +1,140 @@
+"""
+Время разбора листов: однопроходный парсер против прежнего двухэтапного.
+
+Прежний путь (копия кода до однопроходного парсера) сначала собирал сырые
+словари в parse_*_sheet, перебирая списки ключевых слов для каждой ячейки,
+а затем normalize_data заново прогонял некомпилированные re.sub/re.split/
+re.fullmatch по каждому аналогу. Новый путь — normalize_worksheet: один проход
+по строкам с заранее скомпилированными правилами, сразу в CompactTable.
+Перед замером проверяется, что оба пути дают одинаковые строки каталога.
+
+    python -m benchmarks.parse --rows 200000
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+os.environ.setdefault('CATALOG_SNAPSHOT_PATH', '')
+
+import app  # noqa: E402
+from benchmarks import synthetic  # noqa: E402
+from compact_table import CompactTable  # noqa: E402
+from sheets import is_brake_pads_sheet, is_wipers_sheet  # noqa: E402
+
+
+def legacy_parse_wipers_sheet(title, rows):
+    all_data = []
+    current_section = None
+    for row in rows:
+        if len(row) > 0 and row[0].strip():
+            if 'front wipers' in row[0].lower():
+                current_section = 'Front Wipers'
+            elif 'back wipers' in row[0].lower():
+                current_section = 'Back Wipers'
+            elif len(row) >= 2 and row[0].strip() and row[1].strip():
+                if (not any(keyword in row[0].lower() for keyword in ['wipers', 'front', 'back', 'brake', 'pad', 'тормоз']) and
+                        not any(keyword in row[1].lower() for keyword in ['brake', 'pad', 'тормоз'])):
+                    all_data.append({
+                        'main_part': row[0].strip(),
+                        'alt_parts': row[1].strip(),
+                        'section': current_section
+                    })
+    return all_data
+
+
+def legacy_parse_brake_pads_sheet(title, rows):
+    all_data = []
+    worksheet_title = title.lower()
+    if 'front' in worksheet_title and ('brake' in worksheet_title or 'pad' in worksheet_title):
+        current_section = 'Front Brake Pads'
+    elif ('back' in worksheet_title or 'rear' in worksheet_title) and ('brake' in worksheet_title or 'pad' in worksheet_title):
+        current_section = 'Rear Brake Pads'
+    else:
+        current_section = title
+    for row in rows:
+        if len(row) > 0 and row[0].strip():
+            if current_section == title:
+                if 'front brake' in row[0].lower() or 'front pads' in row[0].lower():
+                    current_section = 'Front Brake Pads'
+                elif 'back brake' in row[0].lower() or 'rear brake' in row[0].lower() or 'back pads' in row[0].lower() or 'rear pads' in row[0].lower():
+                    current_section = 'Rear Brake Pads'
+            if len(row) >= 3 and row[0].strip():
+                if (not any(keyword in row[0].lower() for keyword in ['brake', 'pads', 'front', 'back', 'rear', 'part number', 'oe analogue', 'not original', 'wiper', 'wipe', 'щетк']) and
+                        not any(keyword in row[1].lower() for keyword in ['wiper', 'wipe', 'щетк']) and
+                        not any(keyword in row[2].lower() for keyword in ['wiper', 'wipe', 'щетк']) and
+                        row[0].strip() and (row[1].strip() or row[2].strip())):
+                    all_data.append({
+                        'main_part': row[0].strip(),
+                        'oe_analogue': row[1].strip() if len(row) > 1 else '',
+                        'not_original': row[2].strip() if len(row) > 2 else '',
+                        'section': current_section
+                    })
+    return all_data
+
+
+def legacy_normalize_data(raw_data):
+    table = CompactTable(app.WIPERS_GROUP_FIELDS, app.ROW_FIELDS)
+    for item in raw_data:
+        main_part = sys.intern(item['main_part'])
+        alt_parts_str = item['alt_parts']
+        if main_part and alt_parts_str:
+            alt_parts_clean = re.sub(r"\([^)]*\)", "", alt_parts_str)
+            raw_tokens = re.split(r'[/,\s]+', alt_parts_clean)
+            group_id = table.add_group(main_part, item.get('section', 'Unknown'))
+            table.add_row(group_id, main_part)
+            for alt_part in raw_tokens:
+                token = alt_part.strip()
+                if not token:
+                    continue
+                if not re.fullmatch(r'[A-Za-z0-9]+', token):
+                    continue
+                if not re.search(r'\d', token):
+                    continue
+                table.add_row(group_id, sys.intern(token))
+    return table.freeze()
+
+
+def legacy_normalize_worksheet(title, rows):
+    """Прежний путь: сырые словари, затем нормализация"""
+    raw_wipers = legacy_parse_wipers_sheet(title, rows) if not is_brake_pads_sheet(title) else []
+    raw_brake_pads = legacy_parse_brake_pads_sheet(title, rows) if not is_wipers_sheet(title) else []
+    return legacy_normalize_data(raw_wipers), app.normalize_brake_pads_data(raw_brake_pads)
+
+
+def best_of(repeat, function, worksheets):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for title, rows in worksheets:
+            function(title, rows)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000, help='строк в синтетическом листе щёток')
+    parser.add_argument('--repeat', type=int, default=3, help='повторов, берётся лучший')
+    args = parser.parse_args()
+
+    worksheets = synthetic.worksheets(args.rows)
+    for title, rows in worksheets:
+        legacy = legacy_normalize_worksheet(title, rows)
+        current = app.normalize_worksheet(title, rows)
+        for old_table, new_table in zip(legacy, current):
+            if [dict(item) for item in old_table] != [dict(item) for item in new_table]:
+                raise SystemExit(f'Результаты разбора листа {title} различаются')
+
+    legacy_seconds = best_of(args.repeat, legacy_normalize_worksheet, worksheets)
+    current_seconds = best_of(args.repeat, app.normalize_worksheet, worksheets)
+    total_rows = sum(len(rows) for _, rows in worksheets)
+    print(f"Строк в листах: {total_rows}")
+    print(f"двухэтапный разбор:   {legacy_seconds:.3f} с")
+    print(f"однопроходный разбор: {current_seconds:.3f} с ({legacy_seconds / current_seconds:.1f}x быстрее)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Замер стоимости загрузки и поиска по этапам на синтетическом каталоге.
+
+Для каждого размера генерируются листы (benchmarks.synthetic), отдаются через
+офлайн-клиент gspread (benchmarks.fake_gspread) и проходят весь путь
+приложения: чтение листов, разбор, нормализация, построение индексов, поиск
+(линейный и по индексам) и сериализация ответа в JSON. Результат пишется в
+JSON-файл, чтобы сравнивать коммиты между собой:
+
+    python -m benchmarks.run --rows 1000 10000 100000
+    python -m benchmarks.run --compare benchmarks/results/<commit>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault('CATALOG_SNAPSHOT_PATH', '')
+
+import app  # noqa: E402
+import sheets  # noqa: E402
+from benchmarks import fake_gspread, synthetic  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def git_revision():
+    """Коммит и признак незакоммиченных изменений"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return commit, dirty
+
+
+def sample_queries(wipers, brake_pads, count, seed=1):
+    """Запросы как у пользователей: артикулы, аналоги, с опечатками, в другом написании и промахи"""
+    rng = random.Random(seed)
+    wiper_parts = [item['alt_part'] for item in wipers[::max(1, len(wipers) // 1000)]]
+    pad_parts = [item['alt_part'] for item in brake_pads[::max(1, len(brake_pads) // 1000)]]
+    queries = []
+    for i in range(count):
+        part = rng.choice(wiper_parts)
+        kind = i % 5
+        if kind == 1:
+            part = part.lower()
+        elif kind == 2 and len(part) > 3:
+            position = rng.randrange(len(part))
+            part = part[:position] + rng.choice('0123456789') + part[position + 1:]
+        elif kind == 3:
+            part = part[:3]
+        elif kind == 4:
+            part = f'ZZ{rng.randint(10000, 99999)}'
+        queries.append(part)
+    pad_queries = [rng.choice(pad_parts) for _ in range(count)] if pad_parts else []
+    return queries, pad_queries
+
+
+def timed(results, stage, function, ops=1):
+    """Выполняет function() и записывает время этапа"""
+    started = time.perf_counter()
+    value = function()
+    seconds = time.perf_counter() - started
+    results[stage] = {
+        'seconds': round(seconds, 6),
+        'ops': ops,
+        'per_op_ms': round(seconds * 1000 / max(ops, 1), 4),
+    }
+    return value
+
+
+def run_size(rows, queries_count, linear_queries, linear_max_rows):
+    results = {}
+    worksheets = synthetic.worksheets(rows)
+    fake_gspread.install(worksheets)
+
+    fetched = timed(results, 'fetch_worksheets', sheets.fetch_worksheets)
+    raw_wipers, raw_brake_pads = timed(results, 'parse_worksheets', lambda: app.parse_worksheets(fetched))
+    wipers = timed(results, 'normalize_data', lambda: app.normalize_data(raw_wipers))
+    brake_pads = timed(results, 'normalize_brake_pads_data', lambda: app.normalize_brake_pads_data(raw_brake_pads))
+    timed(results, 'normalize_worksheet', lambda: [app.normalize_worksheet(title, values) for title, values in fetched])
+    catalog = timed(results, 'build_catalog', lambda: app.build_catalog('benchmark', wipers, brake_pads))
+
+    queries, pad_queries = sample_queries(wipers, brake_pads, queries_count)
+
+    # Линейные функции проходят весь каталог на каждый запрос
+    if rows <= linear_max_rows:
+        linear = queries[:linear_queries]
+        timed(results, 'search_analogs', lambda: [app.search_analogs(q, wipers) for q in linear], len(linear))
+        timed(results, 'search_by_prefix', lambda: [app.search_by_prefix(q, wipers) for q in linear], len(linear))
+        linear_pads = pad_queries[:linear_queries]
+        timed(results, 'search_brake_pads_analogs',
+              lambda: [app.search_brake_pads_analogs(q, brake_pads) for q in linear_pads], len(linear_pads))
+
+    timed(results, 'search_analogs_indexed',
+          lambda: [app.search_analogs_indexed(q, catalog.wiper_index) for q in queries], len(queries))
+    timed(results, 'search_analogs_transitive',
+          lambda: [app.search_analogs_transitive(q, catalog.wiper_components) for q in queries], len(queries))
+    timed(results, 'search_by_prefix_indexed',
+          lambda: [app.search_by_prefix_indexed(q, catalog.wiper_index) for q in queries], len(queries))
+    timed(results, 'search_fuzzy_indexed',
+          lambda: [app.search_fuzzy_indexed(q, catalog.wiper_index) for q in queries], len(queries))
+    timed(results, 'search_brake_pads_indexed',
+          lambda: [app.search_brake_pads_indexed(q, catalog.brake_pads_index) for q in pad_queries], len(pad_queries))
+    payloads = timed(results, 'wipers_search_payload',
+                     lambda: [app.wipers_search_payload(q, catalog, fuzzy=True) for q in queries], len(queries))
+    timed(results, 'json_serialization', lambda: [app.app.json.dumps(p) for p in payloads], len(payloads))
+
+    return {
+        'rows': rows,
+        'wipers_rows': len(wipers),
+        'brake_pads_rows': len(brake_pads),
+        'stages': results,
+    }
+
+
+def print_results(report, baseline=None):
+    baseline_sizes = {str(size['rows']): size['stages'] for size in (baseline or {}).get('sizes', [])}
+    for size in report['sizes']:
+        print(f"\nrows={size['rows']} (wipers {size['wipers_rows']}, brake pads {size['brake_pads_rows']})")
+        previous = baseline_sizes.get(str(size['rows']), {})
+        for stage, result in size['stages'].items():
+            line = f"  {stage:<28} {result['per_op_ms']:>12.3f} ms/op  x{result['ops']}"
+            if stage in previous and previous[stage]['per_op_ms']:
+                ratio = result['per_op_ms'] / previous[stage]['per_op_ms']
+                line += f"   {ratio:5.2f}x vs {baseline['commit']}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='строк в листе щёток (колодок — вдвое меньше), от 1000 до 1000000')
+    parser.add_argument('--queries', type=int, default=500, help='запросов для поиска по индексам')
+    parser.add_argument('--linear-queries', type=int, default=20, help='запросов для линейного поиска')
+    parser.add_argument('--linear-max-rows', type=int, default=200000,
+                        help='линейный поиск не замеряется на каталогах больше этого')
+    parser.add_argument('--output', help='куда записать JSON (по умолчанию benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='JSON прошлого запуска для сравнения')
+    args = parser.parse_args()
+
+    commit, dirty = git_revision()
+    report = {
+        'commit': commit + ('-dirty' if dirty else ''),
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'sizes': [],
+    }
+    for rows in args.rows:
+        report['sizes'].append(run_size(rows, args.queries, args.linear_queries, args.linear_max_rows))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(report, baseline)
+    print(f"\nРезультаты записаны в {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Стресс-тест публикации каталога: поиск идёт, пока каталог непрерывно пересобирается.
+
+Листы отдаются офлайн-клиентом (benchmarks.fake_gspread). Поток-писатель в
+цикле меняет лист щёток (строка-маркер STRESS01 получает аналог GEN<n> с
+номером поколения) и вызывает catalog_manager.refresh(): лист разбирается
+заново, индексы и кэш строятся в стороне, новый снимок публикуется заменой
+ссылки. Потоки-читатели тем временем отправляют GET /search через тестовый
+клиент Flask: маркер и случайные артикулы каталога.
+
+Для каждого ответа по маркеру проверяется, что поколение в теле соответствует
+версии каталога в ETag — то есть запрос целиком обработан одним снимком.
+Выводятся задержки поиска без пересборок и во время них, число пересборок и
+нарушений; при нарушениях код выхода 1.
+
+    python -m benchmarks.swap_stress --rows 20000 --threads 8 --duration 10
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+os.environ.setdefault('CATALOG_SNAPSHOT_PATH', '')
+os.environ.setdefault('CATALOG_TTL_SECONDS', '86400')
+
+import app  # noqa: E402
+from benchmarks import fake_gspread, synthetic  # noqa: E402
+
+MARKER = 'STRESS01'
+
+
+def marker_sheet(rows, generation):
+    """Лист щёток с маркером, аналог которого зависит от поколения"""
+    return rows + [[MARKER, f'GEN{generation:06d}']]
+
+
+def marker_generation(results):
+    """Поколение из результатов поиска маркера (None, если маркер не найден)"""
+    parts = [part for item in results for part in item['all_parts']]
+    generations = {part for part in parts if part.startswith('GEN')}
+    if len(generations) != 1:
+        return None
+    return int(generations.pop()[3:])
+
+
+def etag_version(response):
+    etag, _ = response.get_etag()
+    return etag.split('-', 1)[0] if etag else None
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def reader(deadline, queries, seed, samples, checks):
+    """Поиск до deadline: (задержка, статус) в samples, (версия, поколение) в checks"""
+    client = app.app.test_client()
+    rng = random.Random(seed)
+    while time.monotonic() < deadline:
+        part_number = MARKER if rng.random() < 0.2 else rng.choice(queries)
+        started = time.perf_counter()
+        response = client.get('/search', query_string={'part_number': part_number})
+        elapsed = time.perf_counter() - started
+        samples.append((elapsed, response.status_code))
+        if part_number == MARKER and response.status_code == 200:
+            checks.append((etag_version(response), marker_generation(response.get_json()['results'])))
+
+
+def writer(stop, fake_client, rows, published, rebuilds):
+    """Пересобирает каталог до stop: версия -> поколение в published, длительности в rebuilds"""
+    generation = 0
+    while not stop.is_set():
+        generation += 1
+        fake_client.worksheets['Wipers'] = marker_sheet(rows, generation)
+        fake_client.modified_time = f'2024-01-01T00:00:00.{generation:06d}Z'
+        started = time.perf_counter()
+        catalog = app.catalog_manager.refresh()
+        rebuilds.append(time.perf_counter() - started)
+        published[catalog.version] = generation
+
+
+def run_phase(duration, threads, queries, rebuild, fake_client, rows):
+    """Одна фаза нагрузки; с rebuild — при непрерывных пересборках"""
+    samples = []
+    checks = []
+    published = {}
+    rebuilds = []
+    stop = threading.Event()
+    deadline = time.monotonic() + duration
+    readers = [
+        threading.Thread(target=reader, args=(deadline, queries, seed, samples, checks))
+        for seed in range(threads)
+    ]
+    rebuilder = threading.Thread(target=writer, args=(stop, fake_client, rows, published, rebuilds)) if rebuild else None
+    if rebuilder is not None:
+        rebuilder.start()
+    for thread in readers:
+        thread.start()
+    for thread in readers:
+        thread.join()
+    stop.set()
+    if rebuilder is not None:
+        rebuilder.join()
+    return samples, checks, published, rebuilds
+
+
+def summarize(name, samples, duration):
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    errors = sum(1 for sample in samples if sample[1] != 200)
+    print(f"{name:<12} {len(samples) / duration:>8.0f} {percentile(latencies, 0.5):>8.2f} "
+          f"{percentile(latencies, 0.99):>8.2f} {latencies[-1] if latencies else 0:>8.2f} {errors:>6}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help='строк в синтетическом листе щёток')
+    parser.add_argument('--threads', type=int, default=8, help='потоков-читателей')
+    parser.add_argument('--duration', type=float, default=10.0, help='секунд на каждую фазу')
+    args = parser.parse_args()
+
+    worksheets = synthetic.worksheets(args.rows)
+    title, rows = worksheets[0]
+    worksheets[0] = (title, marker_sheet(rows, 0))
+    fake_client = fake_gspread.install(worksheets)
+    catalog = app.catalog_manager.get()
+    queries = [item['alt_part'] for item in catalog.wipers[::max(1, len(catalog.wipers) // 1000)]]
+
+    print(f"{'phase':<12} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>6}")
+    samples, _, _, _ = run_phase(args.duration, args.threads, queries, False, fake_client, rows)
+    errors = summarize('idle', samples, args.duration)
+    samples, checks, published, rebuilds = run_phase(args.duration, args.threads, queries, True, fake_client, rows)
+    errors += summarize('rebuilding', samples, args.duration)
+
+    # Версия в ETag и тело ответа должны относиться к одному снимку
+    versions = {}
+    violations = 0
+    for version, generation in checks:
+        if generation is None or versions.setdefault(version, generation) != generation:
+            violations += 1
+        elif version in published and published[version] != generation:
+            violations += 1
+    print(f"\nпересборок: {len(rebuilds)} (в среднем {sum(rebuilds) / max(len(rebuilds), 1):.2f} с), "
+          f"проверок маркера: {len(checks)}, "
+          f"версий в ответах: {len(versions)}, нарушений: {violations}")
+    sys.exit(1 if violations or errors else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Синтетические листы каталога в формате таблицы магазина.
+
+Листы повторяют то, что встречается в настоящей таблице: заголовки секций
+(Front Wipers / Back Wipers), строку заголовков колонок у колодок, пустые
+строки, пометки в скобках, смешанные разделители (',', '/', пробелы), дефисы
+и мусорные значения без цифр. Аналоги берутся из общего пула, поэтому группы
+пересекаются так же, как в жизни (A≍B, B≍C). Генерация детерминирована по seed.
+"""
+
+import random
+
+ALPHABET = 'ABCDEFGHJKLMNPRSTVWXYZ'
+DIGITS = '0123456789'
+NOTES = ['(change mounting)', '(note)', '(hook 9x3)', '(до 2015 г.)', '(side pin)']
+SEPARATORS = [', ', ',', ' / ', '/', ' ', ',  ']
+JUNK = ['see note', '-', 'n/a', 'OEM']
+# Соседние строки щёток делят окно пула аналогов: ROWS_PER_CLUSTER строк на CLUSTER_SIZE артикулов
+ROWS_PER_CLUSTER = 4
+CLUSTER_SIZE = 10
+
+
+def part_number(rng):
+    """Артикул вида 6R1998002, 8K1-955-425, GDB1550"""
+    letters = ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 3)))
+    digits = ''.join(rng.choice(DIGITS) for _ in range(rng.randint(4, 7)))
+    part = rng.choice([letters + digits, digits[:1] + letters + digits[1:], digits + letters])
+    if len(part) > 6 and rng.random() < 0.1:
+        part = f'{part[:3]}-{part[3:6]}-{part[6:]}'
+    return part
+
+
+def part_pool(size, rng):
+    return [part_number(rng) for _ in range(size)]
+
+
+def alt_parts_cell(pool, cluster, rng):
+    """Ячейка со списком аналогов: разные разделители, пометки, мусор.
+
+    Аналоги берутся из окна пула своей группы (cluster) и изредка — из всего
+    пула, поэтому группы взаимозаменяемости небольшие, но иногда сцеплены.
+    """
+    items = []
+    for _ in range(rng.randint(1, 8)):
+        item = rng.choice(cluster) if rng.random() > 0.01 else rng.choice(pool)
+        if rng.random() < 0.1:
+            item = f'{item} {rng.choice(NOTES)}'
+        items.append(item)
+    if rng.random() < 0.05:
+        items.append(rng.choice(JUNK))
+    cell = ''
+    for i, item in enumerate(items):
+        cell += (rng.choice(SEPARATORS) if i else '') + item
+    return cell
+
+
+def wipers_sheet(rows, seed=1):
+    """Лист щёток: (название, строки [артикул, аналоги]) с секциями"""
+    rng = random.Random(seed)
+    pool = part_pool(max(CLUSTER_SIZE, (rows // ROWS_PER_CLUSTER + 1) * CLUSTER_SIZE), rng)
+    values = [['Front Wipers', '']]
+    for i in range(rows):
+        if i == rows * 2 // 3:
+            values.append(['Back Wipers', ''])
+        if rng.random() < 0.01:
+            values.append(['', ''])
+        start = (i // ROWS_PER_CLUSTER) * CLUSTER_SIZE
+        cluster = pool[start:start + CLUSTER_SIZE]
+        main_part = rng.choice(cluster) if rng.random() < 0.3 else part_number(rng)
+        values.append([main_part, alt_parts_cell(pool, cluster, rng)])
+    return 'Wipers', values
+
+
+def brake_pads_sheet(rows, seed=2, title='Front Brake Pads'):
+    """Лист колодок: (название, строки [артикул, OE analogue, Not original])"""
+    rng = random.Random(seed)
+    pool = part_pool(max(10, rows), rng)
+    values = [['Part number', 'OE analogue', 'Not original']]
+    for _ in range(rows):
+        if rng.random() < 0.01:
+            values.append(['', '', ''])
+        oe_analogue = ' / '.join(rng.choice(pool) for _ in range(rng.randint(0, 2)))
+        not_original = rng.choice(['', rng.choice(pool), f'GDB{rng.randint(1000, 9999)} / {rng.randint(100, 999)}-45'])
+        if not oe_analogue and not not_original:
+            not_original = rng.choice(pool)
+        values.append([part_number(rng), oe_analogue, not_original])
+    return title, values
+
+
+def worksheets(wipers_rows, brake_pads_rows=None, seed=1):
+    """Все листы таблицы: щётки, передние и задние колодки"""
+    if brake_pads_rows is None:
+        brake_pads_rows = max(1, wipers_rows // 2)
+    return [
+        wipers_sheet(wipers_rows, seed),
+        brake_pads_sheet(brake_pads_rows - brake_pads_rows // 2, seed + 1, 'Front Brake Pads'),
+        brake_pads_sheet(brake_pads_rows // 2, seed + 2, 'Rear Brake Pads'),
+    ]
@@ -0,0 +1,589 @@
+import os
+import hashlib
+import pickle
+import random
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: без блокировки файла каждый воркер обновляет каталог сам
+    fcntl = None
+
+# Период обновления каталога из Google Sheets (в секундах)
+DEFAULT_TTL_SECONDS = 300
+
+# Повтор после неудачного обновления: первая пауза и потолок (в секундах);
+# после стольких ошибок подряд размыкатель перестаёт пускать запросы к таблице
+DEFAULT_RETRY_BASE_SECONDS = 5
+DEFAULT_RETRY_MAX_SECONDS = 300
+DEFAULT_FAILURE_THRESHOLD = 3
+
+# Push-обновления (/admin/refresh): пауза без новых запросов, после которой
+# выполняется одна загрузка, и предельное ожидание при непрерывных правках
+DEFAULT_PUSH_DEBOUNCE_SECONDS = 2
+DEFAULT_PUSH_MAX_DELAY_SECONDS = 30
+
+# Как часто воркер проверяет, не записал ли другой воркер новый снимок
+SNAPSHOT_WATCH_SECONDS = 2
+
+# Файл снимка каталога на диске: заголовок, формат, источник, версия, SHA-256 и pickle
+SNAPSHOT_MAGIC = b'WIPERCAT'
+# Увеличивать при любом изменении структуры Catalog, индексов или заголовка
+SNAPSHOT_FORMAT = 14
+
+
+class Catalog:
+    """Неизменяемый снимок каталога: данные щёток и колодок, индексы и кэш результатов.
+
+    Снимок собирается целиком до публикации и после неё не меняется, поэтому
+    его можно читать из любого потока без блокировок. Новые значения полей —
+    только в копии через replace().
+    """
+
+    def __init__(self, version, wipers, brake_pads, wiper_index=None, wiper_components=None,
+                 brake_pads_index=None, lookup_index=None, result_cache=None, source_modified=None,
+                 loaded_at=None):
+        self.__dict__.update(
+            version=version,
+            wipers=wipers,
+            brake_pads=brake_pads,
+            wiper_index=wiper_index,
+            wiper_components=wiper_components,
+            brake_pads_index=brake_pads_index,
+            # Общий индекс щёток и колодок для /lookup
+            lookup_index=lookup_index,
+            # Кэш результатов поиска по этой версии (ResultCache)
+            result_cache=result_cache,
+            # modifiedTime таблицы в Drive, из которой построен снимок
+            source_modified=source_modified,
+            loaded_at=loaded_at if loaded_at is not None else time.time(),
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'Catalog неизменяем, используйте replace() вместо присваивания {name}')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'Catalog неизменяем: {name}')
+
+    def replace(self, **changes):
+        """Копия снимка с другими значениями полей; данные, индексы и кэш общие"""
+        return Catalog(**dict(self.__dict__, **changes))
+
+    @property
+    def age(self):
+        """Сколько секунд прошло с последней сверки снимка с таблицей"""
+        return max(0.0, time.time() - self.loaded_at)
+
+
+def save_snapshot(catalog, path, source=''):
+    """Атомарно записывает снимок каталога на диск (pickle protocol 5)"""
+    payload = pickle.dumps(catalog, protocol=5)
+    header = b'%s %d %s %s %s\n' % (
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_FORMAT,
+        source.encode('utf-8') or b'-',
+        catalog.version.encode('ascii'),
+        hashlib.sha256(payload).hexdigest().encode('ascii'),
+    )
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def parse_snapshot_header(header, source=''):
+    """(версия, SHA-256) из первой строки снимка.
+
+    ValueError — заголовок испорчен, None — снимок старого формата или для
+    другой таблицы.
+    """
+    fields = header.split()
+    if len(fields) < 2 or fields[0] != SNAPSHOT_MAGIC or int(fields[1]) != SNAPSHOT_FORMAT:
+        return None
+    _, _, snapshot_source, version, digest = fields
+    if snapshot_source != (source.encode('utf-8') or b'-'):
+        return None
+    return version.decode('ascii'), digest
+
+
+def read_snapshot_version(path, source=''):
+    """Версия каталога из заголовка снимка без чтения и разбора данных (None, если её нет)"""
+    try:
+        with open(path, 'rb') as f:
+            header = parse_snapshot_header(f.readline(), source)
+    except (OSError, ValueError):
+        return None
+    return None if header is None else header[0]
+
+
+def load_snapshot(path, source=''):
+    """Читает снимок каталога с диска.
+
+    Возвращает None, если файла нет, он повреждён (не совпадает контрольная
+    сумма), записан в другом формате или для другой таблицы. Файл пишет только
+    само приложение; контрольная сумма защищает от обрезанных и испорченных
+    файлов, а не от подмены.
+    """
+    try:
+        with open(path, 'rb') as f:
+            header = f.readline()
+            payload = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        print(f"Не удалось прочитать снимок каталога {path}: {e}")
+        return None
+
+    try:
+        parsed = parse_snapshot_header(header, source)
+        if parsed is None:
+            print(f"Снимок каталога {path} устарел или сделан для другой таблицы, игнорируем")
+            return None
+        version, digest = parsed
+        if hashlib.sha256(payload).hexdigest().encode('ascii') != digest:
+            raise ValueError('checksum mismatch')
+        catalog = pickle.loads(payload)
+        if not isinstance(catalog, Catalog) or catalog.version != version:
+            raise ValueError('unexpected snapshot content')
+    except Exception as e:
+        print(f"Снимок каталога {path} повреждён, игнорируем: {e}")
+        return None
+    return catalog
+
+
+class RefreshBreaker:
+    """Экспоненциальные повторы с джиттером и размыкатель для загрузок из таблицы.
+
+    После каждой ошибки подряд следующая попытка откладывается на
+    base * 2^(n-1) секунд (не больше max_delay), умноженные на случайный
+    множитель 0.5–1, чтобы воркеры не обращались к API одновременно. Пока
+    ошибок меньше threshold, размыкатель замкнут: загрузку по запросу можно
+    пробовать сразу. С threshold ошибок подряд он разомкнут до наступления
+    следующей попытки, и запросы не ждут таблицу; первая удачная загрузка
+    замыкает его снова.
+    """
+
+    def __init__(self, base_delay=None, max_delay=None, threshold=None, rng=None):
+        if base_delay is None:
+            base_delay = float(os.getenv('CATALOG_RETRY_BASE_SECONDS', DEFAULT_RETRY_BASE_SECONDS))
+        if max_delay is None:
+            max_delay = float(os.getenv('CATALOG_RETRY_MAX_SECONDS', DEFAULT_RETRY_MAX_SECONDS))
+        if threshold is None:
+            threshold = int(os.getenv('CATALOG_FAILURE_THRESHOLD', DEFAULT_FAILURE_THRESHOLD))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.threshold = max(1, threshold)
+        self._random = rng or random.Random()
+        self.failures = 0
+        self.next_attempt = 0.0
+
+    @property
+    def is_open(self):
+        """Разомкнут: ошибок подряд не меньше threshold и время повтора не наступило"""
+        return self.failures >= self.threshold and time.monotonic() < self.next_attempt
+
+    def allow(self):
+        """Можно ли сейчас обращаться к таблице"""
+        return not self.is_open
+
+    def retry_in(self):
+        """Секунд до следующей попытки после ошибки (0 — можно сейчас)"""
+        return max(0.0, self.next_attempt - time.monotonic())
+
+    def record_success(self):
+        self.failures = 0
+        self.next_attempt = 0.0
+
+    def record_failure(self):
+        self.failures += 1
+        delay = min(self.max_delay, self.base_delay * 2 ** (self.failures - 1))
+        self.next_attempt = time.monotonic() + delay * self._random.uniform(0.5, 1.0)
+
+    def status(self):
+        return {
+            'state': 'open' if self.is_open else 'closed',
+            'consecutive_failures': self.failures,
+            'retry_in_seconds': round(self.retry_in(), 1),
+        }
+
+
+class CatalogManager:
+    """Держит каталог в памяти процесса и обновляет его в фоновом потоке.
+
+    Обработчики запросов только читают текущий снимок через get(); загрузка из
+    таблицы выполняется вызовом loader(current), который возвращает новый Catalog,
+    сам current (или его копию через replace), если данные не изменились, или None.
+
+    Если задан snapshot_path, каждый новый снимок сохраняется на диск, а при
+    старте процесса каталог сначала читается из файла и сверяется с таблицей
+    в фоне, когда ему исполнится TTL.
+    """
+
+    def __init__(self, loader, ttl=None, snapshot_path=None, snapshot_source='', breaker=None,
+                 debounce=None, max_delay=None):
+        self._loader = loader
+        if ttl is None:
+            ttl = float(os.getenv('CATALOG_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.snapshot_source = snapshot_source
+        self._saved_version = None
+        self._from_snapshot = False
+        self._catalog = None
+        self._load_lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+        self._last_error = None
+        self._last_success = None
+        self.breaker = breaker or RefreshBreaker()
+        if debounce is None:
+            debounce = float(os.getenv('CATALOG_PUSH_DEBOUNCE_SECONDS', DEFAULT_PUSH_DEBOUNCE_SECONDS))
+        if max_delay is None:
+            max_delay = float(os.getenv('CATALOG_PUSH_MAX_DELAY_SECONDS', DEFAULT_PUSH_MAX_DELAY_SECONDS))
+        self.debounce = debounce
+        self.max_delay = max(max_delay, debounce)
+        # Очередь push-обновлений: листы (None — вся таблица), время первого и
+        # последнего запроса; _wakeup будит фоновый поток
+        self._pending_lock = threading.Lock()
+        self._pending_sheets = set()
+        self._pending_all = False
+        self._pending_first = None
+        self._pending_last = None
+        self._pending_requests = 0
+        self._wakeup = threading.Event()
+        self._snapshot_mtime = None
+        self._lock_file = None
+        self._lock_pid = None
+        self.push_refreshes = 0
+
+    def get(self):
+        """Возвращает текущий снимок; при первом обращении загружает его синхронно"""
+        self.start()
+        catalog = self._catalog
+        # Пока размыкатель разомкнут, запрос без каталога сразу получает None,
+        # а не ждёт очередного обращения к недоступной таблице
+        if catalog is None and self.breaker.allow():
+            with self._load_lock:
+                # Пока ждали блокировку, каталог мог загрузить другой поток
+                catalog = self._catalog
+                if catalog is None:
+                    catalog = self._load()
+        return catalog
+
+    def load_snapshot(self):
+        """Загружает каталог из файла снимка, если текущего ещё нет"""
+        if not self.snapshot_path or self._catalog is not None:
+            return self._catalog
+        started = time.perf_counter()
+        self._snapshot_mtime = self._stat_snapshot()
+        catalog = load_snapshot(self.snapshot_path, self.snapshot_source)
+        if catalog is not None:
+            # mtime файла — время последней сверки с таблицей (см. _touch_snapshot)
+            if self._snapshot_mtime is not None:
+                catalog = catalog.replace(loaded_at=max(catalog.loaded_at, self._snapshot_mtime / 1e9))
+            self._catalog = catalog
+            self._saved_version = catalog.version
+            self._from_snapshot = True
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"Каталог {catalog.version} загружен из снимка за {elapsed:.0f} мс")
+        return catalog
+
+    def preload(self):
+        """Синхронно готовит каталог без запуска фонового потока.
+
+        Вызывается в мастер-процессе gunicorn до fork: каталог из снимка старше
+        TTL сразу сверяется с таблицей, чтобы воркеры не начинали с устаревшего.
+        """
+        self.load_snapshot()
+        with self._load_lock:
+            if self._catalog is None or self._catalog.age >= self.ttl:
+                self._load()
+        return self._catalog
+
+    def refresh(self, sheets=None, force=False):
+        """Перезагружает каталог (только листы sheets, если заданы); при ошибке
+        остаётся предыдущий снимок"""
+        with self._load_lock:
+            return self._load(sheets, force)
+
+    # Внеплановое обновление (например, по правке в таблице): запросы копятся,
+    # пока не пройдёт debounce секунд без новых (но не дольше max_delay), и
+    # выполняются в _run одной загрузкой loader(current, sheets=..., force=True).
+    # Запрос приходит в один воркер; остальные подхватывают записанный им
+    # снимок, проверяя файл раз в SNAPSHOT_WATCH_SECONDS
+    def request_refresh(self, sheets=None):
+        """Ставит в очередь обновление листов sheets (None — всей таблицы).
+
+        Не ждёт загрузки: запросы, пришедшие до её начала, объединяются в одну.
+        Возвращает число запросов, ожидающих в очереди.
+        """
+        now = time.monotonic()
+        with self._pending_lock:
+            if self._pending_first is None:
+                self._pending_first = now
+            self._pending_last = now
+            self._pending_requests += 1
+            if sheets is None:
+                self._pending_all = True
+            else:
+                self._pending_sheets.update(sheets)
+            pending = self._pending_requests
+        self.start()
+        self._wakeup.set()
+        return pending
+
+    def start(self):
+        """Запускает фоновое обновление (повторно — после fork в воркере)"""
+        pid = os.getpid()
+        if self._thread is not None and self._thread_pid == pid and self._thread.is_alive():
+            return
+        with self._load_lock:
+            if self._thread is not None and self._thread_pid == pid and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='catalog-refresh', daemon=True)
+            self._thread_pid = pid
+            self._thread.start()
+
+    @property
+    def current(self):
+        """Текущий снимок без загрузки и запуска обновления (None, если его нет)"""
+        return self._catalog
+
+    @property
+    def version(self):
+        """Версия текущего снимка или None, если каталог ещё не загружен"""
+        catalog = self._catalog
+        return None if catalog is None else catalog.version
+
+    @property
+    def is_refresh_leader(self):
+        """Сверяет ли этот процесс каталог с таблицей по TTL (а не следит за снимком)"""
+        if not self.snapshot_path or fcntl is None:
+            return True
+        return self._lock_file is not None and self._lock_pid == os.getpid()
+
+    @property
+    def state(self):
+        """ok; degraded — обновления не проходят, отдаётся последний удачный снимок;
+        unavailable — обновления не проходят и отдавать нечего"""
+        if not self.breaker.failures:
+            return 'ok'
+        return 'degraded' if self._catalog is not None else 'unavailable'
+
+    def status(self):
+        """Состояние каталога для /health"""
+        catalog = self._catalog
+        status = {
+            'state': self.state,
+            'loaded': catalog is not None,
+            'ttl_seconds': self.ttl,
+            'last_error': self._last_error,
+            'last_success_seconds_ago': None if self._last_success is None else round(time.time() - self._last_success, 1),
+            'refresh': self.breaker.status(),
+            'push': self._push_status(),
+            'refresh_leader': self.is_refresh_leader,
+        }
+        if catalog is not None:
+            status.update({
+                # Ведомый узнаёт о сверке ведущего с опозданием до SNAPSHOT_WATCH_SECONDS
+                'stale': catalog.age > self.ttl + (0 if self.is_refresh_leader else SNAPSHOT_WATCH_SECONDS),
+                'from_snapshot': self._from_snapshot,
+                'version': catalog.version,
+                'age_seconds': round(catalog.age, 1),
+                'wipers_rows': len(catalog.wipers),
+                'brake_pads_rows': len(catalog.brake_pads),
+                'wiper_tokens': len(catalog.wiper_index) if catalog.wiper_index is not None else 0,
+                'brake_pads_tokens': len(catalog.brake_pads_index) if catalog.brake_pads_index is not None else 0,
+            })
+        return status
+
+    def _load(self, sheets=None, force=False):
+        # Размыкатель разомкнут: таблицу не трогаем, остаётся прежний снимок
+        if not self.breaker.allow():
+            return self._catalog
+        error = None
+        try:
+            if sheets is None and not force:
+                catalog = self._loader(self._catalog)
+            else:
+                catalog = self._loader(self._catalog, sheets=sheets, force=force)
+        except Exception as e:
+            catalog = None
+            error = str(e)
+            print(f"Ошибка при обновлении каталога: {e}")
+        if catalog is None:
+            self._last_error = error or 'No data received from table'
+            self.breaker.record_failure()
+            return self._catalog
+        self._last_error = None
+        self._last_success = time.time()
+        self.breaker.record_success()
+        current = self._catalog
+        if current is not None and current.version == catalog.version:
+            # Данные не изменились: новый только маленький объект снимка, а
+            # данные, индексы и кэш остаются прежними (и страницы памяти,
+            # общие с мастером после fork, не копируются)
+            self._catalog = catalog.replace(loaded_at=time.time())
+            self._from_snapshot = False
+            self._touch_snapshot()
+            return self._catalog
+        self._catalog = catalog
+        self._from_snapshot = False
+        self._save_snapshot(catalog)
+        return catalog
+
+    def _save_snapshot(self, catalog):
+        if not self.snapshot_path or catalog.version == self._saved_version:
+            return
+        try:
+            save_snapshot(catalog, self.snapshot_path, self.snapshot_source)
+            self._saved_version = catalog.version
+            self._snapshot_mtime = self._stat_snapshot()
+        except Exception as e:
+            print(f"Не удалось сохранить снимок каталога: {e}")
+
+    def _touch_snapshot(self):
+        # Каталог сверен и не изменился: новое mtime файла говорит остальным
+        # воркерам, что их копия свежая, без перезаписи снимка
+        if not self.snapshot_path or self._saved_version != self._catalog.version:
+            return
+        try:
+            os.utime(self.snapshot_path)
+            self._snapshot_mtime = self._stat_snapshot()
+        except OSError:
+            pass
+
+    def _acquire_refresh_lock(self):
+        # Неблокирующая попытка стать ведущим. Блокировка flock принадлежит
+        # открытому файлу, поэтому после fork её нужно брать заново
+        if self.is_refresh_leader:
+            return True
+        try:
+            lock_file = open(f'{self.snapshot_path}.lock', 'a')
+        except OSError as e:
+            print(f"Не удалось открыть файл блокировки снимка: {e}")
+            return False
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        self._lock_pid = os.getpid()
+        print(f"Воркер {self._lock_pid} сверяет каталог с таблицей по TTL")
+        return True
+
+    def _stat_snapshot(self):
+        try:
+            return os.stat(self.snapshot_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _watch_snapshot(self):
+        # Снимок перезаписал или обновил другой воркер (после push-обновления
+        # или своей плановой сверки) — берём его вместо запроса к таблице
+        mtime = self._stat_snapshot()
+        if mtime is None or mtime == self._snapshot_mtime:
+            return
+        self._snapshot_mtime = mtime
+        current = self._catalog
+        if current is not None and read_snapshot_version(self.snapshot_path, self.snapshot_source) == current.version:
+            # Та же версия: данные не разбираем, только отмечаем время сверки
+            with self._load_lock:
+                if self._catalog is current:
+                    self._catalog = current.replace(loaded_at=max(current.loaded_at, mtime / 1e9))
+                    self._from_snapshot = False
+            return
+        catalog = load_snapshot(self.snapshot_path, self.snapshot_source)
+        if catalog is None:
+            return
+        with self._load_lock:
+            current = self._catalog
+            if current is None or current.version != catalog.version:
+                self._catalog = catalog.replace(loaded_at=max(catalog.loaded_at, mtime / 1e9))
+                self._saved_version = catalog.version
+                self._from_snapshot = False
+                print(f"Каталог {catalog.version} подхвачен из снимка другого воркера")
+
+    def _pending_due(self):
+        # Когда выполнять накопленные запросы: после паузы debounce без новых,
+        # но не позже max_delay от первого; None — очередь пуста
+        with self._pending_lock:
+            if self._pending_first is None:
+                return None
+            return min(self._pending_last + self.debounce, self._pending_first + self.max_delay)
+
+    def _take_pending(self):
+        with self._pending_lock:
+            sheets = None if self._pending_all else self._pending_sheets
+            self._pending_sheets = set()
+            self._pending_all = False
+            self._pending_first = None
+            self._pending_last = None
+            self._pending_requests = 0
+        return sheets
+
+    def _push_status(self):
+        with self._pending_lock:
+            return {
+                'pending_requests': self._pending_requests,
+                'pending_sheets': None if self._pending_all else sorted(self._pending_sheets),
+                'refreshes': self.push_refreshes,
+            }
+
+    def _run(self):
+        # Новый снимок собирается в стороне и публикуется одним присваиванием
+        # ссылки _catalog (RCU): get() читает её без блокировок, запрос берёт
+        # снимок один раз и никогда не видит две версии, а старый снимок
+        # освобождается, когда его отпустит последний запрос. _load_lock лишь
+        # не даёт двум загрузкам идти одновременно.
+        # При ошибке загрузки остаётся последний удачный снимок, а следующая
+        # попытка — по расписанию RefreshBreaker (см. _refresh_delay).
+        # С файлом снимка по TTL таблицу сверяет только ведущий — держатель
+        # flock на snapshot_path + '.lock'; остальные следят за файлом, а по
+        # его mtime узнают, что ведущий сверил неизменившийся каталог
+        if self.snapshot_path and fcntl is not None:
+            self._acquire_refresh_lock()
+        next_refresh = time.monotonic() + self._refresh_delay()
+        while True:
+            now = time.monotonic()
+            wake_at = next_refresh
+            due = self._pending_due()
+            if due is not None:
+                wake_at = min(wake_at, due)
+            if self.snapshot_path:
+                wake_at = min(wake_at, now + SNAPSHOT_WATCH_SECONDS)
+            self._wakeup.wait(max(0.0, wake_at - now))
+            self._wakeup.clear()
+
+            now = time.monotonic()
+            due = self._pending_due()
+            if due is not None and now >= due:
+                sheets = self._take_pending()
+                self.push_refreshes += 1
+                self.refresh(sheets, force=True)
+                next_refresh = time.monotonic() + self._refresh_delay()
+            elif now >= next_refresh:
+                # Ведомый сверяется с таблицей сам, только если ведущего нет
+                # (он умер — тогда блокировка переходит к этому воркеру)
+                if self._acquire_refresh_lock():
+                    self.refresh()
+                    next_refresh = time.monotonic() + self._refresh_delay()
+                else:
+                    self._watch_snapshot()
+                    next_refresh = time.monotonic() + max(self._refresh_delay(), SNAPSHOT_WATCH_SECONDS)
+            elif self.snapshot_path:
+                self._watch_snapshot()
+
+    def _refresh_delay(self):
+        # После ошибки следующая попытка — по расписанию повторов, а не через
+        # TTL; иначе — когда снимку исполнится TTL (после fork или загрузки
+        # из файла он уже не новый)
+        if self.breaker.failures:
+            return self.breaker.retry_in()
+        catalog = self._catalog
+        if catalog is None:
+            return self.ttl
+        return max(0.0, self.ttl - catalog.age)
@@ -0,0 +1,146 @@
+from array import array
+from collections.abc import Mapping
+
+
+class CompactTable:
+    """Строки каталога в колонках вместо списка словарей.
+
+    Поля, общие для всех строк одной исходной строки таблицы (group_fields:
+    main_part, section, OE-поля колодок), хранятся один раз на группу; в самой
+    строке остаются номер группы и собственные поля (row_fields: alt_part).
+    Все значения — номера в общем списке уникальных строк, колонки — array('I'),
+    так что на строку каталога приходится несколько байт вместо отдельного
+    словаря. Таблица итерируется записями CompactRecord, которые читаются как
+    словари, поэтому код, написанный для списка словарей, работает без изменений.
+    """
+
+    __slots__ = ('group_fields', 'row_fields', 'fields', 'strings', 'group_columns',
+                 'row_groups', 'row_columns', '_string_ids')
+
+    def __init__(self, group_fields, row_fields):
+        self.group_fields = tuple(group_fields)
+        self.row_fields = tuple(row_fields)
+        self.fields = self.group_fields + self.row_fields
+        self.strings = []
+        self.group_columns = {field: array('I') for field in self.group_fields}
+        self.row_groups = array('I')
+        self.row_columns = {field: array('I') for field in self.row_fields}
+        # Значение -> номер в strings; нужен только пока таблица заполняется
+        self._string_ids = {}
+
+    def add_group(self, *values):
+        """Добавляет группу со значениями group_fields и возвращает её номер"""
+        group_id = len(self.group_columns[self.group_fields[0]])
+        for field, value in zip(self.group_fields, values):
+            self.group_columns[field].append(self._string_id(value))
+        return group_id
+
+    def add_row(self, group_id, *values):
+        """Добавляет строку группы group_id со значениями row_fields"""
+        self.row_groups.append(group_id)
+        for field, value in zip(self.row_fields, values):
+            self.row_columns[field].append(self._string_id(value))
+
+    def add_rows(self, group_id, values):
+        """Добавляет несколько строк группы group_id (таблица с одним полем строки)"""
+        (column,) = self.row_columns.values()
+        row_groups = self.row_groups
+        strings = self.strings
+        string_ids = self._string_ids
+        for value in values:
+            string_id = string_ids.get(value)
+            if string_id is None:
+                string_id = string_ids[value] = len(strings)
+                strings.append(value)
+            column.append(string_id)
+            row_groups.append(group_id)
+
+    def extend(self, other):
+        """Дописывает строки другой таблицы с теми же полями"""
+        strings = [self._string_id(value) for value in other.strings]
+        group_offset = len(self.group_columns[self.group_fields[0]])
+        for field in self.group_fields:
+            self.group_columns[field].extend(strings[i] for i in other.group_columns[field])
+        self.row_groups.extend(group_id + group_offset for group_id in other.row_groups)
+        for field in self.row_fields:
+            self.row_columns[field].extend(strings[i] for i in other.row_columns[field])
+
+    @classmethod
+    def concat(cls, tables, group_fields, row_fields):
+        """Одна таблица из нескольких (например, по листам таблицы)"""
+        result = cls(group_fields, row_fields)
+        for table in tables:
+            result.extend(table)
+        return result.freeze()
+
+    def freeze(self):
+        """Освобождает словарь строк, нужный только при заполнении"""
+        self._string_ids = None
+        return self
+
+    def _string_id(self, value):
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def __len__(self):
+        return len(self.row_groups)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [CompactRecord(self, i) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError('CompactTable index out of range')
+        return CompactRecord(self, row)
+
+    def __iter__(self):
+        for row in range(len(self.row_groups)):
+            yield CompactRecord(self, row)
+
+    def __getstate__(self):
+        return None, {slot: getattr(self, slot) for slot in self.__slots__ if slot != '_string_ids'}
+
+    def __setstate__(self, state):
+        for slot, value in state[1].items():
+            setattr(self, slot, value)
+        self._string_ids = None
+
+
+class CompactRecord(Mapping):
+    """Строка CompactTable с интерфейсом словаря (item['main_part'], item.get(...))"""
+
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, field):
+        table = self.table
+        column = table.row_columns.get(field)
+        if column is not None:
+            return table.strings[column[self.row]]
+        return table.strings[table.group_columns[field][table.row_groups[self.row]]]
+
+    def get(self, field, default=None):
+        table = self.table
+        column = table.row_columns.get(field)
+        if column is not None:
+            return table.strings[column[self.row]]
+        column = table.group_columns.get(field)
+        if column is None:
+            return default
+        return table.strings[column[table.row_groups[self.row]]]
+
+    def __iter__(self):
+        return iter(self.table.fields)
+
+    def __len__(self):
+        return len(self.table.fields)
+
+    def __repr__(self):
+        return repr(dict(self))
@@ -0,0 +1,31 @@
+import gc
+import os
+
+# Настройки gunicorn для `gunicorn -c gunicorn.conf.py app:app`.
+# Порт и число воркеров gunicorn по умолчанию берёт из PORT и WEB_CONCURRENCY.
+
+# Мастер импортирует приложение и строит каталог с индексами один раз до fork;
+# воркеры получают его через copy-on-write вместо собственной загрузки из таблицы
+preload_app = os.getenv('CATALOG_PRELOAD', '1') == '1'
+
+
+def when_ready(server):
+    """Мастер: загрузка каталога до запуска воркеров"""
+    if preload_app:
+        from app import catalog_manager
+        catalog_manager.preload()
+
+
+def pre_fork(server, worker):
+    """Мастер: переносим все объекты в постоянное поколение GC.
+
+    Сборщик мусора при обходе пишет в заголовки объектов, из-за чего ядро
+    копировало бы в каждый воркер все страницы с каталогом.
+    """
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Воркер: запуск фонового обновления каталога в этом процессе"""
+    from app import catalog_manager
+    catalog_manager.start()
@@ -0,0 +1,119 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+
+# Допустимое имя файла профиля (защита от выхода за пределы каталога)
+DUMP_NAME_RE = re.compile(r'[A-Za-z0-9_.-]+\.prof')
+
+
+def server_timing_header(entries):
+    """Значение заголовка Server-Timing из списка (этап, секунды или None, описание)"""
+    metrics = []
+    for name, seconds, description in entries:
+        metric = name
+        if seconds is not None:
+            metric += f';dur={seconds * 1000:.3f}'
+        if description:
+            metric += f';desc="{description}"'
+        metrics.append(metric)
+    return ', '.join(metrics)
+
+
+class SampledProfiler:
+    """Профилирование случайной доли запросов через cProfile.
+
+    Каждый запрос с вероятностью sample_rate выполняется под cProfile, а
+    статистика сохраняется в directory в формате pstats (.prof). Одновременно
+    профилируется не больше одного запроса в процессе: остальные в это время
+    не выбираются, чтобы профили не смешивались. Хранится не больше max_dumps
+    последних файлов. Каталог общий для всех воркеров, поэтому профили любого
+    из них доступны через любой воркер.
+    """
+
+    def __init__(self, directory, sample_rate=0.0, max_dumps=100):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_dumps = max_dumps
+        self._busy = threading.Lock()
+        self._random = random.Random()
+
+    def start(self):
+        """Начинает профилирование, если запрос попал в выборку; иначе None"""
+        if self.sample_rate <= 0 or self._random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            profile = cProfile.Profile()
+            profile.enable()
+        except Exception:
+            self._busy.release()
+            raise
+        return profile
+
+    def stop(self, profile, label):
+        """Останавливает профилирование и сохраняет статистику; возвращает имя файла"""
+        try:
+            profile.disable()
+        finally:
+            self._busy.release()
+        os.makedirs(self.directory, exist_ok=True)
+        label = re.sub(r'[^A-Za-z0-9_-]+', '-', label).strip('-') or 'request'
+        now = time.time()
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now))
+        name = f'{stamp}.{int(now * 1000) % 1000:03d}-{os.getpid()}-{label}.prof'
+        profile.dump_stats(os.path.join(self.directory, name))
+        self._prune()
+        return name
+
+    def discard(self, profile):
+        """Останавливает профилирование без сохранения статистики"""
+        try:
+            profile.disable()
+        finally:
+            self._busy.release()
+
+    def dumps(self):
+        """Сохранённые профили от новых к старым: имя, размер и время создания"""
+        try:
+            names = [name for name in os.listdir(self.directory) if DUMP_NAME_RE.fullmatch(name)]
+        except FileNotFoundError:
+            return []
+        result = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            result.append({'name': name, 'size': stat.st_size, 'created': stat.st_mtime})
+        result.sort(key=lambda dump: dump['created'], reverse=True)
+        return result
+
+    def path(self, name):
+        """Путь к файлу профиля или None, если такого профиля нет"""
+        if not DUMP_NAME_RE.fullmatch(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def report(self, names, sort='cumulative', limit=40):
+        """Текстовый отчёт pstats по одному или нескольким профилям (суммарно)"""
+        paths = [path for path in (self.path(name) for name in names) if path is not None]
+        if not paths:
+            return None
+        output = io.StringIO()
+        stats = pstats.Stats(*paths, stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def _prune(self):
+        for dump in self.dumps()[self.max_dumps:]:
+            try:
+                os.remove(os.path.join(self.directory, dump['name']))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,109 @@
+import threading
+from collections import OrderedDict
+
+
+class _Flight:
+    """Вычисление, которое уже выполняет другой поток"""
+
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    """Ограниченный LRU-кэш сериализованных результатов поиска.
+
+    Кэш входит в снимок каталога (Catalog.result_cache): у каждой версии свой
+    кэш, поэтому сбрасывать его при обновлении не нужно, а запрос к старому
+    снимку не смешивается с результатами нового. Одновременные промахи по
+    одному ключу объединяются — считает только первый поток, остальные ждут
+    его результат. В снимок на диске кэш попадает пустым.
+
+    Попадание обходится без блокировки: get и move_to_end у OrderedDict —
+    отдельные атомарные операции под GIL. Порядок LRU при этом приблизительный
+    (ключ могут вытеснить между get и move_to_end), а hits может недосчитаться
+    при одновременных попаданиях — это только метрика. _lock берут промахи,
+    вставка с вытеснением и stats().
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def get_or_compute(self, key, compute):
+        """Значение для key из кэша или результат compute()"""
+        if self.maxsize <= 0:
+            return compute()
+
+        key = tuple(key)
+        value = self._entries.get(key)
+        if value is not None:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                pass
+            self.hits += 1
+            return value
+
+        with self._lock:
+            # Пока ждали блокировку, значение мог положить другой поток
+            value = self._entries.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if flight.error is None:
+                    self._entries[key] = flight.value
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+            flight.event.set()
+        return flight.value
+
+    def stats(self):
+        """Счётчики для /health"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'coalesced': self.coalesced,
+            }
+
+    def __getstate__(self):
+        return {'maxsize': self.maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(state['maxsize'])
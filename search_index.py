@@ -0,0 +1,348 @@
+import threading
+from array import array
+from bisect import bisect_left
+from zlib import crc32
+
+
+class PrefixIndex:
+    """Отсортированный список нормализованных ключей для поиска по префиксу.
+
+    Диапазон ключей с нужным префиксом находится двумя бинарными поисками,
+    поэтому стоимость запроса зависит от числа совпадений, а не от размера каталога.
+    """
+
+    __slots__ = ('keys',)
+
+    def __init__(self, keys):
+        self.keys = sorted(keys)
+
+    def iter_prefix(self, prefix):
+        """Ключи, начинающиеся с prefix, в лексикографическом порядке"""
+        keys = self.keys
+        start = bisect_left(keys, prefix)
+        # Ключи состоят только из A-Z0-9, поэтому U+FFFF больше любого продолжения
+        end = bisect_left(keys, prefix + '\uffff', start)
+        for position in range(start, end):
+            yield keys[position]
+
+    def complete(self, prefix, limit):
+        """Первые limit ключей с префиксом prefix (сам prefix, если он есть, — первым)"""
+        keys = self.keys
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + '\uffff', start, min(len(keys), start + limit))
+        return keys[start:end]
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def edit_distance(a, b, max_distance):
+    """Расстояние Дамерау—Левенштейна (OSA: перестановка соседних символов = 1).
+
+    Считается только полоса шириной max_distance вокруг диагонали; как только
+    расстояние заведомо больше max_distance, возвращает max_distance + 1.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    limit = max_distance + 1
+    len_b = len(b)
+    previous2 = None
+    previous = [j if j <= max_distance else limit for j in range(len_b + 1)]
+    for i in range(1, len(a) + 1):
+        current = [limit] * (len_b + 1)
+        if i <= max_distance:
+            current[0] = i
+        row_min = current[0]
+        char_a = a[i - 1]
+        for j in range(max(1, i - max_distance), min(len_b, i + max_distance) + 1):
+            value = previous[j - 1] if char_a == b[j - 1] else previous[j - 1] + 1
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == b[j - 1] and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            if value > limit:
+                value = limit
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min >= limit:
+            return limit
+        previous2, previous = previous, current
+    return previous[len_b]
+
+
+def _bigrams(key):
+    padded = f'^{key}$'
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def _deletes(key, max_deletes):
+    """Строки, получаемые из key удалением не больше max_deletes символов (включая сам key)"""
+    variants = {key}
+    frontier = {key}
+    for _ in range(max_deletes):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+class FuzzyIndex:
+    """Индекс симметричного удаления для поиска артикулов с опечатками.
+
+    Если расстояние между запросом и ключом не больше k (замена, вставка,
+    удаление или перестановка соседних символов), то удалением не больше k
+    символов из каждого можно получить одну и ту же строку. Поэтому для ключей
+    заранее хранятся все варианты с удалением до MAX_DISTANCE символов, а
+    запрос порождает свои варианты: кандидаты — ключи с общим вариантом, и
+    расстояние считается только для них (обычно единицы-десятки ключей
+    вместо сотен у биграммного фильтра).
+
+    Варианты хранятся не строками, а CRC32 в одном отсортированном массиве
+    (хэш << 32 | номер ключа): ~30 записей по 8 байт на ключ из 7–8 символов.
+    Коллизии лишь добавляют кандидатов и отсеиваются проверкой расстояния.
+
+    Массив строится при первом поиске, а не вместе с каталогом: обновления
+    (в том числе push по одному листу) не платят за него временем и памятью,
+    а в снимок на диске попадают только ключи.
+    """
+
+    __slots__ = ('keys', 'entries', '_build_lock')
+
+    MAX_DISTANCE = 2
+    # Записи раскладываются по корзинам по старшим битам хэша, чтобы при
+    # сортировке в памяти был список int только одной корзины, а не всех
+    BUILD_BUCKET_BITS = 8
+
+    def __init__(self, keys):
+        # Список ключей общий с PrefixIndex: номер ключа — позиция в нём
+        self.keys = keys
+        self.entries = None
+        self._build_lock = threading.Lock()
+
+    def __getstate__(self):
+        return {'keys': self.keys}
+
+    def __setstate__(self, state):
+        self.__init__(state['keys'])
+
+    def _build_entries(self):
+        shift = 64 - self.BUILD_BUCKET_BITS
+        buckets = [array('Q') for _ in range(1 << self.BUILD_BUCKET_BITS)]
+        for key_id, key in enumerate(self.keys):
+            if not key:
+                continue
+            for variant in _deletes(key, self.MAX_DISTANCE):
+                entry = crc32(variant.encode('utf-8')) << 32 | key_id
+                buckets[entry >> shift].append(entry)
+        entries = array('Q')
+        for i, bucket in enumerate(buckets):
+            entries.extend(sorted(bucket))
+            buckets[i] = None
+        return entries
+
+    def _get_entries(self):
+        entries = self.entries
+        if entries is None:
+            with self._build_lock:
+                entries = self.entries
+                if entries is None:
+                    entries = self.entries = self._build_entries()
+        return entries
+
+    def candidates(self, query, max_distance):
+        """Номера ключей, у которых есть общий с запросом вариант удаления"""
+        entries = self._get_entries()
+        size = len(entries)
+        result = set()
+        for variant in _deletes(query, max_distance):
+            variant_hash = crc32(variant.encode('utf-8'))
+            position = bisect_left(entries, variant_hash << 32)
+            while position < size and entries[position] >> 32 == variant_hash:
+                result.add(entries[position] & 0xFFFFFFFF)
+                position += 1
+        return result
+
+    def search(self, query, max_distance=2, limit=10):
+        """Пары (ключ, расстояние) в пределах max_distance, ближайшие первыми"""
+        if max_distance > self.MAX_DISTANCE:
+            raise ValueError(f'max_distance must be at most {self.MAX_DISTANCE}')
+        # Для коротких запросов почти любой ключ в пределах двух правок — уменьшаем допуск
+        grams = _bigrams(query)
+        while max_distance > 0 and len(grams) - 3 * max_distance < 1:
+            max_distance -= 1
+        if max_distance == 0:
+            return []
+
+        keys = self.keys
+        matches = []
+        for key_id in self.candidates(query, max_distance):
+            key = keys[key_id]
+            if key == query or abs(len(key) - len(query)) > max_distance:
+                continue
+            distance = edit_distance(query, key, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, key))
+        matches.sort()
+        return [(key, distance) for distance, key in matches[:limit]]
+
+
+class AnalogIndex:
+    """Хэш-индекс: нормализованный артикул -> идентификаторы групп аналогов.
+
+    Группа — кортеж (main_part, all_parts, section) с уже отсортированным
+    all_parts; одинаковые группы хранятся один раз и адресуются по номеру.
+    Для каждого артикула хранится плоский массив (group_id, first_row, ...),
+    где first_row — номер первой строки каталога, давшей совпадение; по нему
+    восстанавливается исходный порядок групп при объединении результатов.
+    Массив array('I') — один объект без отдельных int внутри: меньше памяти и
+    меньше страниц, которые счётчики ссылок копируют в воркерах после fork.
+    """
+
+    __slots__ = ('groups', 'tokens', 'prefix', 'fuzzy')
+
+    def __init__(self):
+        self.groups = []
+        self.tokens = {}
+        self.prefix = None
+        self.fuzzy = None
+
+    @classmethod
+    def build(cls, token_groups):
+        """Собирает индекс из словаря token -> {main_part: (parts, section, first_row)}"""
+        index = cls()
+        group_ids = {}
+        for token, groups in token_groups.items():
+            entries = []
+            for main_part, (parts, section, first_row) in groups.items():
+                group = (main_part, tuple(sorted(parts)), section)
+                group_id = group_ids.get(group)
+                if group_id is None:
+                    group_id = group_ids[group] = len(index.groups)
+                    index.groups.append(group)
+                entries.append(group_id)
+                entries.append(first_row)
+            index.tokens[token] = array('I', entries)
+        index.prefix = PrefixIndex(index.tokens)
+        index.fuzzy = FuzzyIndex(index.prefix.keys)
+        return index
+
+    def lookup(self, token):
+        """Группы для нормализованного артикула (пустой список, если не найден)"""
+        groups = self.groups
+        return [groups[group_id] for group_id in self.tokens.get(token, ())[::2]]
+
+    def entries(self, token):
+        """Пары (группа, first_row) для нормализованного артикула"""
+        groups = self.groups
+        flat = self.tokens.get(token, ())
+        return [(groups[flat[i]], flat[i + 1]) for i in range(0, len(flat), 2)]
+
+    def __len__(self):
+        return len(self.tokens)
+
+
+class RecordIndex:
+    """Хэш-индекс: нормализованный артикул -> записи каталога.
+
+    Запись — кортеж полей ответа (для колодок: main_part, section, oe_analogue,
+    not_original); одинаковые записи хранятся один раз, а для артикула хранится
+    array('I') номеров его записей в порядке строк каталога. Ключи доступны
+    для поиска по префиксу и с опечатками, как в AnalogIndex.
+    """
+
+    __slots__ = ('records', 'tokens', 'prefix', 'fuzzy')
+
+    def __init__(self):
+        self.records = []
+        self.tokens = {}
+        self.prefix = None
+        self.fuzzy = None
+
+    @classmethod
+    def build(cls, token_records, fuzzy=True):
+        """Собирает индекс из словаря token -> записи (без повторов, в порядке строк).
+
+        fuzzy=False не строит индекс для поиска с опечатками (fuzzy остаётся None).
+        """
+        index = cls()
+        record_ids = {}
+        for token, records in token_records.items():
+            ids = array('I')
+            for record in records:
+                record_id = record_ids.get(record)
+                if record_id is None:
+                    record_id = record_ids[record] = len(index.records)
+                    index.records.append(record)
+                ids.append(record_id)
+            index.tokens[token] = ids
+        index.prefix = PrefixIndex(index.tokens)
+        if fuzzy:
+            index.fuzzy = FuzzyIndex(index.prefix.keys)
+        return index
+
+    def lookup(self, token):
+        """Записи для нормализованного артикула (пустой список, если не найден)"""
+        records = self.records
+        return [records[record_id] for record_id in self.tokens.get(token, ())]
+
+    def __len__(self):
+        return len(self.tokens)
+
+
+class UnionFind:
+    """Система непересекающихся множеств со сжатием путей и объединением по размеру"""
+
+    __slots__ = ('parent', 'size')
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def find(self, item):
+        parent = self.parent
+        if item not in parent:
+            parent[item] = item
+            self.size[item] = 1
+            return item
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+        while parent[item] != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    def union(self, a, b):
+        root_a = self.find(a)
+        root_b = self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+
+class ComponentIndex:
+    """Транзитивные группы взаимозаменяемости: компоненты связности графа main/alt.
+
+    Каждая компонента хранится готовым кортежем (main_part, all_parts, section,
+    main_parts, sections) с отсортированными all_parts, а tokens отображает
+    нормализованный артикул в номер его компоненты.
+    """
+
+    __slots__ = ('groups', 'tokens')
+
+    def __init__(self, groups, tokens):
+        self.groups = groups
+        self.tokens = tokens
+
+    def lookup(self, token):
+        """Компонента для нормализованного артикула или None"""
+        component_id = self.tokens.get(token)
+        return None if component_id is None else self.groups[component_id]
+
+    def __len__(self):
+        return len(self.groups)
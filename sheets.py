@@ -0,0 +1,236 @@
+import os
+import json
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import gspread
+from gspread.urls import SPREADSHEET_URL, SPREADSHEET_VALUES_BATCH_URL
+from gspread.utils import absolute_range_name, fill_gaps
+from google.auth.transport.requests import AuthorizedSession, Request
+from google.oauth2.service_account import Credentials
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import Counter, Histogram
+
+# Настройка Google Sheets API
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive'
+]
+
+# Ключевые слова в названии листа, по которым он относится к одному из каталогов
+BRAKE_PADS_TITLE_KEYWORDS = ['brake', 'pad', 'тормоз']
+WIPERS_TITLE_KEYWORDS = ['wiper', 'wipe', 'щетк']
+
+# Колонки, которые читает каждый парсер: щётки — A (артикул) и B (аналоги),
+# колодки — A (артикул), B (OE analogue) и C (Not original)
+WIPERS_COLUMNS = 'A:B'
+BRAKE_PADS_COLUMNS = 'A:C'
+
+# Токен обновляется заранее, если до истечения осталось меньше этого запаса
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+
+# Метрики запросов к Google API; kind — metadata, batchGet, drive или token
+sheets_request_seconds = Histogram('sheets_request_seconds', 'Длительность запросов к Google API', ['kind'])
+sheets_errors_total = Counter('sheets_errors_total', 'Ошибки запросов к Google API', ['kind'])
+sheets_throttled_total = Counter('sheets_throttled_total', 'Ответы 429 (превышена квота) от Google API', ['kind'])
+
+
+def observed_request(kind, call, *args, **kwargs):
+    """Выполняет запрос к Google API, учитывая длительность, ошибки и ответы 429"""
+    started = time.perf_counter()
+    try:
+        return call(*args, **kwargs)
+    except Exception as e:
+        sheets_errors_total.inc(kind=kind)
+        if getattr(getattr(e, 'response', None), 'status_code', None) == 429:
+            sheets_throttled_total.inc(kind=kind)
+        raise
+    finally:
+        sheets_request_seconds.observe(time.perf_counter() - started, kind=kind)
+
+
+# Адреса Google API, которые GOOGLE_API_BASE_URL перенаправляет на другой сервер
+GOOGLE_API_HOSTS = ('https://sheets.googleapis.com', 'https://www.googleapis.com')
+
+
+class BaseUrlAdapter(HTTPAdapter):
+    """HTTPAdapter, который отправляет запросы к Google API на другой адрес.
+
+    Нужен для нагрузочных тестов с локальной имитацией Sheets API
+    (GOOGLE_API_BASE_URL=http://127.0.0.1:8081): меняется только схема и хост,
+    путь и параметры запроса остаются прежними.
+    """
+
+    def __init__(self, base_url, **kwargs):
+        self.base_url = base_url.rstrip('/')
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        for host in GOOGLE_API_HOSTS:
+            if request.url.startswith(host + '/'):
+                request.url = self.base_url + request.url[len(host):]
+                break
+        return super().send(request, **kwargs)
+
+
+def is_brake_pads_sheet(title):
+    """Лист с тормозными колодками (по названию)"""
+    title = title.lower()
+    return any(keyword in title for keyword in BRAKE_PADS_TITLE_KEYWORDS)
+
+
+def is_wipers_sheet(title):
+    """Лист со щётками стеклоочистителей (по названию)"""
+    title = title.lower()
+    return any(keyword in title for keyword in WIPERS_TITLE_KEYWORDS)
+
+
+def sheet_columns(title):
+    """Диапазон колонок, нужный парсерам, которые читают этот лист"""
+    if is_wipers_sheet(title) and not is_brake_pads_sheet(title):
+        return WIPERS_COLUMNS
+    return BRAKE_PADS_COLUMNS
+
+
+class SheetsClientHolder:
+    """Общий для процесса авторизованный клиент gspread.
+
+    Ключ сервисного аккаунта разбирается и Credentials создаются один раз;
+    access token переиспользуется, пока до его истечения не останется меньше
+    TOKEN_REFRESH_MARGIN, и обновляется под блокировкой, чтобы параллельные
+    потоки gthread-воркера не запрашивали токен одновременно. Все запросы идут
+    через одну HTTP-сессию с пулом соединений (keep-alive, без повторных
+    TLS-рукопожатий). После fork сессия создаётся заново, чтобы воркеры не
+    делили сокеты мастера.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._credentials = None
+        self._client = None
+        self._token_request = None
+        self._pid = None
+
+    def get(self):
+        """Возвращает клиента с действующим токеном"""
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = self._build_credentials()
+            if self._client is None or self._pid != os.getpid():
+                self._client = self._build_client(self._credentials)
+                # Токен запрашивается через отдельную неавторизованную сессию
+                self._token_request = Request(requests.Session())
+                self._pid = os.getpid()
+            if self._token_expiring():
+                observed_request('token', self._credentials.refresh, self._token_request)
+            return self._client
+
+    def reset(self):
+        """Сбрасывает клиента и учётные данные (например, после смены ключа)"""
+        with self._lock:
+            self._credentials = None
+            self._client = None
+            self._token_request = None
+            self._pid = None
+
+    def _build_credentials(self):
+        service_account_key = os.getenv("GOOGLE_SERVICE_ACCOUNT_KEY")
+        if not service_account_key:
+            raise ValueError("GOOGLE_SERVICE_ACCOUNT_KEY не установлен в переменной окружения")
+
+        service_account_info = json.loads(service_account_key)
+        return Credentials.from_service_account_info(service_account_info, scopes=SCOPES)
+
+    def _build_client(self, credentials):
+        pool_size = int(os.getenv('SHEETS_HTTP_POOL_SIZE', 10))
+        session = AuthorizedSession(credentials)
+        base_url = os.getenv('GOOGLE_API_BASE_URL')
+        if base_url:
+            adapter = BaseUrlAdapter(base_url, pool_connections=pool_size, pool_maxsize=pool_size)
+        else:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+
+        client = gspread.Client(auth=credentials, session=session)
+        client.set_timeout(float(os.getenv('SHEETS_TIMEOUT_SECONDS', 30)))
+        return client
+
+    def _token_expiring(self):
+        credentials = self._credentials
+        if not credentials.token or credentials.expiry is None:
+            return True
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return credentials.expiry - now < TOKEN_REFRESH_MARGIN
+
+
+# Единственный держатель клиента на процесс
+client_holder = SheetsClientHolder()
+
+
+def get_client():
+    """Авторизованный клиент gspread из GOOGLE_SERVICE_ACCOUNT_KEY"""
+    return client_holder.get()
+
+
+def get_spreadsheet_id():
+    """ID таблицы из GOOGLE_SHEETS_ID"""
+    spreadsheet_id = os.getenv('GOOGLE_SHEETS_ID')
+    if not spreadsheet_id:
+        raise ValueError("GOOGLE_SHEETS_ID не установлен в переменной окружения")
+    return spreadsheet_id
+
+
+def fetch_worksheets(titles=None):
+    """Читает все листы таблицы (или только titles) за один запрос values:batchGet.
+
+    Возвращает список (название листа, строки) в порядке листов в таблице
+    (или в порядке titles). Строки дополняются пустыми ячейками до одинаковой
+    ширины, как в Worksheet.get_all_values(). Ошибки API пробрасываются
+    вызывающему коду.
+    """
+    client = get_client()
+    spreadsheet_id = get_spreadsheet_id()
+
+    if titles is None:
+        # Названия листов — из метаданных без данных ячеек
+        metadata = observed_request(
+            'metadata',
+            client.request,
+            'get',
+            SPREADSHEET_URL % spreadsheet_id,
+            params={'fields': 'sheets.properties.title'}
+        ).json()
+        titles = [sheet['properties']['title'] for sheet in metadata.get('sheets', [])]
+    if not titles:
+        return []
+
+    ranges = [absolute_range_name(title, sheet_columns(title)) for title in titles]
+    response = observed_request(
+        'batchGet',
+        client.request,
+        'get',
+        SPREADSHEET_VALUES_BATCH_URL % spreadsheet_id,
+        params={'ranges': ranges}
+    ).json()
+
+    worksheets = []
+    for title, value_range in zip(titles, response.get('valueRanges', [])):
+        values = value_range.get('values', [])
+        worksheets.append((title, fill_gaps(values) if values else []))
+    return worksheets
+
+
+def fetch_modified_time():
+    """Время последнего изменения таблицы по метаданным Drive (один лёгкий запрос)"""
+    metadata = observed_request('drive', get_client().get_file_drive_metadata, get_spreadsheet_id())
+    return metadata.get('modifiedTime')
+
+
+def worksheet_hash(rows):
+    """Хэш содержимого листа для поиска изменившихся листов"""
+    payload = json.dumps(rows, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
@@ -72,6 +72,124 @@ document.addEventListener('DOMContentLoaded', function() {
         results.classList.remove('hidden');
     }
 
+    // Подсказки при вводе: запрос к /suggest после паузы в наборе, устаревший
+    // запрос отменяется, ответы запоминаются на время жизни страницы
+    const suggestionsList = document.getElementById('suggestions');
+    const SUGGEST_DELAY_MS = 150;
+    const SUGGEST_MIN_LENGTH = 2;
+    const SUGGEST_CACHE_SIZE = 100;
+    const suggestCache = new Map();
+    let suggestTimer = null;
+    let suggestController = null;
+    let activeSuggestion = -1;
+
+    // Тот же вид, в котором сервер сравнивает артикулы (без ведущей v и разделителей)
+    function normalizePrefix(value) {
+        return value.trim().replace(/^v/i, '').replace(/[^A-Za-z0-9]/g, '').toUpperCase();
+    }
+
+    function hideSuggestions() {
+        clearTimeout(suggestTimer);
+        if (suggestController) {
+            suggestController.abort();
+            suggestController = null;
+        }
+        activeSuggestion = -1;
+        suggestionsList.classList.add('hidden');
+        suggestionsList.innerHTML = '';
+        searchInput.setAttribute('aria-expanded', 'false');
+    }
+
+    function renderSuggestions(suggestions) {
+        activeSuggestion = -1;
+        suggestionsList.innerHTML = '';
+        // Подсказка, совпадающая с уже введённым артикулом, не нужна
+        const items = suggestions.filter(part => part !== normalizePrefix(searchInput.value));
+        if (items.length === 0) {
+            suggestionsList.classList.add('hidden');
+            searchInput.setAttribute('aria-expanded', 'false');
+            return;
+        }
+        items.forEach(part => {
+            const item = document.createElement('li');
+            item.className = 'suggestion';
+            item.setAttribute('role', 'option');
+            item.textContent = part;
+            // mousedown раньше blur: поле не теряет фокус до выбора
+            item.addEventListener('mousedown', e => e.preventDefault());
+            item.addEventListener('click', () => selectSuggestion(part));
+            suggestionsList.appendChild(item);
+        });
+        suggestionsList.classList.remove('hidden');
+        searchInput.setAttribute('aria-expanded', 'true');
+    }
+
+    function highlightSuggestion(index) {
+        const items = suggestionsList.querySelectorAll('.suggestion');
+        if (items.length === 0) {
+            return;
+        }
+        activeSuggestion = (index + items.length) % items.length;
+        items.forEach((item, i) => item.classList.toggle('active', i === activeSuggestion));
+        items[activeSuggestion].scrollIntoView({ block: 'nearest' });
+    }
+
+    function selectSuggestion(part) {
+        searchInput.value = part;
+        performSearch();
+    }
+
+    async function loadSuggestions(prefix) {
+        const cached = suggestCache.get(prefix);
+        if (cached) {
+            renderSuggestions(cached);
+            return;
+        }
+        if (suggestController) {
+            suggestController.abort();
+        }
+        const controller = new AbortController();
+        suggestController = controller;
+        try {
+            const params = new URLSearchParams({ part_prefix: prefix });
+            const response = await fetch(`/suggest?${params}`, { signal: controller.signal });
+            if (!response.ok) {
+                return;
+            }
+            const data = await response.json();
+            suggestCache.set(prefix, data.suggestions);
+            if (suggestCache.size > SUGGEST_CACHE_SIZE) {
+                suggestCache.delete(suggestCache.keys().next().value);
+            }
+            // Пока шёл запрос, пользователь мог продолжить ввод
+            if (suggestController === controller && normalizePrefix(searchInput.value) === prefix) {
+                renderSuggestions(data.suggestions);
+            }
+        } catch (err) {
+            if (err.name !== 'AbortError') {
+                console.error('Ошибка подсказок:', err);
+            }
+        } finally {
+            if (suggestController === controller) {
+                suggestController = null;
+            }
+        }
+    }
+
+    function scheduleSuggestions() {
+        clearTimeout(suggestTimer);
+        const prefix = normalizePrefix(searchInput.value);
+        if (prefix.length < SUGGEST_MIN_LENGTH) {
+            hideSuggestions();
+            return;
+        }
+        if (suggestCache.has(prefix)) {
+            loadSuggestions(prefix);
+            return;
+        }
+        suggestTimer = setTimeout(() => loadSuggestions(prefix), SUGGEST_DELAY_MS);
+    }
+
     // Функция для выполнения поиска
     async function performSearch() {
         const partNumber = searchInput.value.trim();
@@ -81,17 +199,15 @@ document.addEventListener('DOMContentLoaded', function() {
             return;
         }
 
+        hideSuggestions();
         showLoading();
 
         try {
-            // 1) Точный поиск
-            const response = await fetch('/search', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ part_number: partNumber })
-            });
+            // Точный поиск. GET-запрос кэшируется браузером и service worker
+            // с проверкой ETag; fuzzy: полный артикул с опечаткой сервер дополнит похожими,
+            // а недописанный — найденными по началу
+            const params = new URLSearchParams({ part_number: partNumber, fuzzy: '1' });
+            const response = await fetch(`/search?${params}`);
 
             const data = await response.json();
 
@@ -99,31 +215,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error(data.error || 'Произошла ошибка при поиске');
             }
 
-            // Если ничего не найдено, пробуем поиск по префиксу (первые 3 символа)
-            if ((!data.results || data.results.length === 0) && partNumber.length >= 3) {
-                try {
-                    const prefixResponse = await fetch('/search-prefix', {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json',
-                        },
-                        body: JSON.stringify({ part_prefix: partNumber })
-                    });
-
-                    const prefixData = await prefixResponse.json();
-
-                    if (!prefixResponse.ok) {
-                        throw new Error(prefixData.error || 'Произошла ошибка при поиске по префиксу');
-                    }
-
-                    showResults(prefixData);
-                    return;
-                } catch (prefixErr) {
-                    console.error('Ошибка префиксного поиска:', prefixErr);
-                    // Если префиксный поиск тоже упал — покажем исходный результат/сообщение
-                }
-            }
-
+            // Поиск по префиксу при пустом точном результате сервер делает сам
             showResults(data);
 
         } catch (err) {
@@ -135,13 +227,31 @@ document.addEventListener('DOMContentLoaded', function() {
     // Обработчик клика по кнопке поиска
     searchBtn.addEventListener('click', performSearch);
 
-    // Обработчик нажатия Enter в поле ввода
-    searchInput.addEventListener('keypress', function(e) {
-        if (e.key === 'Enter') {
-            performSearch();
+    // Enter — поиск (или выбор подсказки), стрелки — переход по подсказкам
+    searchInput.addEventListener('keydown', function(e) {
+        const suggestionsOpen = !suggestionsList.classList.contains('hidden');
+        if (e.key === 'ArrowDown' && suggestionsOpen) {
+            e.preventDefault();
+            highlightSuggestion(activeSuggestion + 1);
+        } else if (e.key === 'ArrowUp' && suggestionsOpen) {
+            e.preventDefault();
+            highlightSuggestion(activeSuggestion - 1);
+        } else if (e.key === 'Escape') {
+            hideSuggestions();
+        } else if (e.key === 'Enter') {
+            e.preventDefault();
+            const items = suggestionsList.querySelectorAll('.suggestion');
+            if (suggestionsOpen && activeSuggestion >= 0 && items[activeSuggestion]) {
+                selectSuggestion(items[activeSuggestion].textContent);
+            } else {
+                performSearch();
+            }
         }
     });
 
+    searchInput.addEventListener('input', scheduleSuggestions);
+    searchInput.addEventListener('blur', hideSuggestions);
+
     // Фокус на поле ввода при загрузке страницы (только на десктопе)
     if (window.innerWidth > 768) {
         searchInput.focus();
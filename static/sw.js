@@ -1,5 +1,10 @@
 // Service Worker for Wiper Search PWA
-const CACHE_NAME = 'wiper-search-v1';
+const CACHE_NAME = 'wiper-search-v3';
+// Результаты поиска: сервер отдаёт их с ETag и Cache-Control по версии каталога
+const RESULTS_CACHE_NAME = 'wiper-search-results-v1';
+// Для офлайна хватает последних запросов: старые записи вытесняются
+const RESULTS_CACHE_MAX_ENTRIES = 50;
+const SEARCH_PATHS = ['/search', '/search-brake-pads'];
 const urlsToCache = [
   '/',
   '/static/css/style.css',
@@ -7,6 +12,13 @@ const urlsToCache = [
   '/static/manifest.json'
 ];
 
+// Удаляет самые старые записи, пока их больше maxEntries (keys() идут в порядке добавления)
+function trimCache(cache, maxEntries) {
+  return cache.keys().then(keys => {
+    return Promise.all(keys.slice(0, Math.max(0, keys.length - maxEntries)).map(key => cache.delete(key)));
+  });
+}
+
 // Install event
 self.addEventListener('install', event => {
   event.waitUntil(
@@ -20,6 +32,30 @@ self.addEventListener('install', event => {
 
 // Fetch event
 self.addEventListener('fetch', event => {
+  const url = new URL(event.request.url);
+
+  // Поиск: сеть (HTTP-кэш браузера сам делает условный запрос с If-None-Match),
+  // а без сети — последний сохранённый ответ
+  if (event.request.method === 'GET' && SEARCH_PATHS.includes(url.pathname)) {
+    event.respondWith(
+      fetch(event.request)
+        .then(response => {
+          if (response.ok) {
+            const copy = response.clone();
+            event.waitUntil(
+              caches.open(RESULTS_CACHE_NAME)
+                .then(cache => cache.delete(event.request)
+                  .then(() => cache.put(event.request, copy))
+                  .then(() => trimCache(cache, RESULTS_CACHE_MAX_ENTRIES)))
+            );
+          }
+          return response;
+        })
+        .catch(() => caches.match(event.request))
+    );
+    return;
+  }
+
   event.respondWith(
     caches.match(event.request)
       .then(response => {
@@ -36,7 +72,7 @@ self.addEventListener('activate', event => {
     caches.keys().then(cacheNames => {
       return Promise.all(
         cacheNames.map(cacheName => {
-          if (cacheName !== CACHE_NAME) {
+          if (cacheName !== CACHE_NAME && cacheName !== RESULTS_CACHE_NAME) {
             console.log('Deleting old cache:', cacheName);
             return caches.delete(cacheName);
           }
@@ -0,0 +1,54 @@
+import os
+import unittest
+
+os.environ.setdefault('CATALOG_SNAPSHOT_PATH', '')
+
+import app  # noqa: E402
+from search_index import UnionFind  # noqa: E402
+
+# A1≍B22 и C33≍B22: A1 и C33 взаимозаменяемы только транзитивно
+RAW_WIPERS = [
+    {'main_part': 'A1', 'alt_parts': 'B22, X9', 'section': 'Front Wipers'},
+    {'main_part': 'C33', 'alt_parts': 'B22', 'section': 'Back Wipers'},
+    {'main_part': 'D44', 'alt_parts': 'E55', 'section': 'Front Wipers'},
+]
+
+
+class UnionFindTest(unittest.TestCase):
+    def test_union_joins_chains(self):
+        union_find = UnionFind()
+        union_find.union('a', 'b')
+        union_find.union('c', 'b')
+        union_find.find('d')
+        self.assertEqual(union_find.find('a'), union_find.find('c'))
+        self.assertNotEqual(union_find.find('a'), union_find.find('d'))
+        self.assertEqual(union_find.size[union_find.find('a')], 3)
+
+
+class AnalogGroupsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data = app.normalize_data(RAW_WIPERS)
+        cls.components = app.build_component_index(cls.data)
+        cls.index = app.build_analog_index(cls.data)
+
+    def test_transitive_group_spans_both_main_parts(self):
+        for query in ('A1', 'c-33', 'b22', 'X9'):
+            with self.subTest(query=query):
+                [group] = app.search_analogs_transitive(query, self.components)
+                self.assertEqual(group['all_parts'], ['A1', 'B22', 'C33', 'X9'])
+                self.assertEqual(group['main_parts'], ['A1', 'C33'])
+                self.assertEqual(group['sections'], ['Front Wipers', 'Back Wipers'])
+
+    def test_unrelated_group_stays_separate(self):
+        [group] = app.search_analogs_transitive('E55', self.components)
+        self.assertEqual(group['all_parts'], ['D44', 'E55'])
+        self.assertEqual(app.search_analogs_transitive('ZZZ9', self.components), [])
+
+    def test_direct_groups_do_not_follow_chains(self):
+        main_parts = [group['main_part'] for group in app.search_analogs_indexed('X9', self.index)]
+        self.assertEqual(main_parts, ['A1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
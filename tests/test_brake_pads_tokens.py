@@ -0,0 +1,53 @@
+import os
+import unittest
+
+os.environ.setdefault('CATALOG_SNAPSHOT_PATH', '')
+
+import app  # noqa: E402
+
+RAW_BRAKE_PADS = [
+    {'main_part': 'P100', 'oe_analogue': '1K0 698 151', 'not_original': '0 986 494 123 / GDB 1550', 'section': 'Front Brake Pads'},
+    {'main_part': 'P200', 'oe_analogue': '8K0698151; 123-45', 'not_original': 'FDB4050 (note)', 'section': 'Rear Brake Pads'},
+    {'main_part': 'P300', 'oe_analogue': '', 'not_original': 'GDB3300 FDB3300', 'section': 'Front Brake Pads'},
+]
+
+
+class BrakePadsTokensTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data = app.normalize_brake_pads_data(RAW_BRAKE_PADS)
+        cls.index = app.build_brake_pads_index(cls.data)
+
+    def main_parts(self, part_number):
+        indexed = [record['main_part'] for record in app.search_brake_pads_indexed(part_number, self.index)]
+        linear = [record['main_part'] for record in app.search_brake_pads_analogs(part_number, self.data)]
+        self.assertEqual(indexed, linear)
+        return indexed
+
+    def test_split_keeps_spaced_numbers(self):
+        self.assertEqual(
+            app.split_brake_pads_cell('0 986 494 123 / GDB 1550'),
+            ['0 986 494 123', '986', '494', '123', 'GDB 1550', '1550'],
+        )
+        self.assertEqual(app.split_brake_pads_cell('8K0698151; 123-45\nFDB4050 (note)'), ['8K0698151', '123-45', 'FDB4050'])
+
+    def test_spaced_and_compact_forms_match(self):
+        for query in ('0 986 494 123', '0986494123', '1K0 698 151', '1K0698151', 'GDB 1550', 'gdb1550'):
+            with self.subTest(query=query):
+                self.assertEqual(self.main_parts(query), ['P100'])
+
+    def test_space_separated_numbers_match_separately(self):
+        self.assertEqual(app.split_brake_pads_cell('GDB3300 FDB3300'), ['GDB3300 FDB3300', 'GDB3300', 'FDB3300'])
+        for query in ('GDB3300', 'fdb3300', 'GDB3300 FDB3300'):
+            with self.subTest(query=query):
+                self.assertEqual(self.main_parts(query), ['P300'])
+
+    def test_short_fragments_do_not_match(self):
+        self.assertEqual(app.split_brake_pads_cell('0 / 12 / A1'), [])
+        for query in ('0', '98', '12'):
+            with self.subTest(query=query):
+                self.assertEqual(self.main_parts(query), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import unittest
+from unittest import mock
+
+os.environ.setdefault('CATALOG_SNAPSHOT_PATH', '')
+
+import app  # noqa: E402
+import sheets  # noqa: E402
+from benchmarks import fake_gspread, swap_stress, synthetic  # noqa: E402
+from catalog import CatalogManager  # noqa: E402
+
+ROWS = 300
+READERS = 4
+DURATION = 1.5
+
+
+class CatalogSwapTest(unittest.TestCase):
+    def setUp(self):
+        patches = [
+            mock.patch.dict(os.environ),
+            mock.patch.object(sheets, 'client_holder', sheets.client_holder),
+            mock.patch.object(app, 'catalog_manager', CatalogManager(app.CatalogLoader(), ttl=86400)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        worksheets = synthetic.worksheets(ROWS)
+        title, self.rows = worksheets[0]
+        worksheets[0] = (title, swap_stress.marker_sheet(self.rows, 0))
+        self.fake_client = fake_gspread.install(worksheets)
+
+    def test_readers_never_see_a_mixed_catalog(self):
+        catalog = app.catalog_manager.refresh()
+        queries = [item['alt_part'] for item in catalog.wipers[::max(1, len(catalog.wipers) // 50)]]
+        samples, checks, published, rebuilds = swap_stress.run_phase(
+            DURATION, READERS, queries, True, self.fake_client, self.rows)
+
+        self.assertEqual([status for _, status in samples if status != 200], [])
+        self.assertGreater(len(rebuilds), 1)
+        self.assertTrue(checks)
+        # Поколение маркера в теле совпадает с тем, что писатель опубликовал под версией из ETag
+        versions = {}
+        for version, generation in checks:
+            self.assertIsNotNone(generation)
+            self.assertEqual(versions.setdefault(version, generation), generation)
+            if version in published:
+                self.assertEqual(published[version], generation)
+        self.assertGreater(len(versions), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
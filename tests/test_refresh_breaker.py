@@ -0,0 +1,83 @@
+import os
+import time
+import unittest
+
+os.environ.setdefault('CATALOG_SNAPSHOT_PATH', '')
+
+import app  # noqa: E402
+from catalog import CatalogManager, RefreshBreaker  # noqa: E402
+
+
+class FullJitter:
+    """Случайный множитель без разброса: всегда верхняя граница"""
+
+    def uniform(self, low, high):
+        return high
+
+
+def make_catalog(version='v1'):
+    data = app.normalize_data([{'main_part': 'A1', 'alt_parts': 'B22', 'section': 'Front Wipers'}])
+    return app.build_catalog(version, data, app.normalize_brake_pads_data([]))
+
+
+class RefreshBreakerTest(unittest.TestCase):
+    def test_backoff_doubles_up_to_max_delay(self):
+        breaker = RefreshBreaker(base_delay=5, max_delay=30, threshold=10, rng=FullJitter())
+        delays = []
+        for _ in range(5):
+            breaker.record_failure()
+            delays.append(round(breaker.retry_in()))
+        self.assertEqual(delays, [5, 10, 20, 30, 30])
+
+    def test_opens_after_threshold_and_closes_on_success(self):
+        breaker = RefreshBreaker(base_delay=60, max_delay=60, threshold=2, rng=FullJitter())
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.status()['state'], 'open')
+        breaker.record_success()
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.status(), {'state': 'closed', 'consecutive_failures': 0, 'retry_in_seconds': 0.0})
+
+    def test_allows_a_retry_once_the_delay_passes(self):
+        breaker = RefreshBreaker(base_delay=0.05, max_delay=0.05, threshold=1, rng=FullJitter())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+
+
+class CatalogManagerFailureTest(unittest.TestCase):
+    def test_keeps_serving_last_good_catalog(self):
+        results = [make_catalog('v1')]
+
+        def loader(current):
+            if results:
+                return results.pop()
+            raise RuntimeError('429 quota')
+
+        breaker = RefreshBreaker(base_delay=60, max_delay=60, threshold=2, rng=FullJitter())
+        manager = CatalogManager(loader, ttl=3600, breaker=breaker)
+        self.assertEqual(manager.refresh().version, 'v1')
+        self.assertEqual(manager.refresh().version, 'v1')
+        self.assertEqual(manager.state, 'degraded')
+        self.assertEqual(manager.status()['last_error'], '429 quota')
+
+    def test_open_breaker_skips_the_loader(self):
+        calls = []
+
+        def loader(current):
+            calls.append(1)
+            return None
+
+        breaker = RefreshBreaker(base_delay=60, max_delay=60, threshold=1, rng=FullJitter())
+        manager = CatalogManager(loader, ttl=3600, breaker=breaker)
+        self.assertIsNone(manager.refresh())
+        self.assertIsNone(manager.refresh())
+        self.assertEqual(calls, [1])
+        self.assertEqual(manager.state, 'unavailable')
+
+
+if __name__ == '__main__':
+    unittest.main()
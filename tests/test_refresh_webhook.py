@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+os.environ.setdefault('CATALOG_SNAPSHOT_PATH', '')
+
+import app  # noqa: E402
+from catalog import CatalogManager  # noqa: E402
+
+SECRET = 'test-secret'
+
+
+class RecordingLoader:
+    """Загрузчик, запоминающий листы каждой загрузки"""
+
+    def __init__(self):
+        self.calls = []
+        self.loaded = threading.Event()
+
+    def __call__(self, current, sheets=None, force=False):
+        self.calls.append((sheets, force))
+        self.loaded.set()
+        return current
+
+
+class AdminRefreshTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.app.test_client()
+        patches = [
+            mock.patch.dict(os.environ, {'REFRESH_WEBHOOK_SECRET': SECRET}),
+            mock.patch.object(app.catalog_manager, 'request_refresh', return_value=1),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.request_refresh = app.catalog_manager.request_refresh
+
+    def post(self, payload, secret=SECRET):
+        body = json.dumps(payload).encode('utf-8')
+        signature = app.REFRESH_SIGNATURE_PREFIX + app.refresh_signature(secret, body)
+        return self.client.post('/admin/refresh', data=body, headers={'X-Signature': signature})
+
+    def test_signed_request_is_queued(self):
+        response = self.post({'sheet': 'Wipers', 'timestamp': time.time()})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json()['status'], 'queued')
+        self.request_refresh.assert_called_once_with(['Wipers'])
+
+    def test_without_sheet_refreshes_whole_table(self):
+        self.assertEqual(self.post({'timestamp': time.time()}).status_code, 202)
+        self.request_refresh.assert_called_once_with(None)
+
+    def test_rejected_requests(self):
+        cases = {
+            'wrong secret': ({'timestamp': time.time()}, 'other-secret', 401),
+            'expired timestamp': ({'timestamp': time.time() - 3600}, SECRET, 401),
+            'missing timestamp': ({'sheet': 'Wipers'}, SECRET, 401),
+            'boolean timestamp': ({'timestamp': True}, SECRET, 401),
+            'empty sheet': ({'sheet': '', 'timestamp': time.time()}, SECRET, 400),
+            'not an object': (['Wipers'], SECRET, 400),
+        }
+        for name, (payload, secret, status) in cases.items():
+            with self.subTest(name):
+                self.assertEqual(self.post(payload, secret).status_code, status)
+        self.request_refresh.assert_not_called()
+
+    def test_unsigned_request_is_rejected(self):
+        body = json.dumps({'timestamp': time.time()})
+        self.assertEqual(self.client.post('/admin/refresh', data=body).status_code, 401)
+
+    def test_disabled_without_secret(self):
+        with mock.patch.dict(os.environ, {'REFRESH_WEBHOOK_SECRET': ''}):
+            self.assertEqual(self.post({'timestamp': time.time()}).status_code, 404)
+
+
+class RefreshQueueTest(unittest.TestCase):
+    def test_burst_of_requests_makes_one_load(self):
+        loader = RecordingLoader()
+        manager = CatalogManager(loader, ttl=3600, debounce=0.2, max_delay=5)
+        self.assertEqual(manager.request_refresh(['Wipers']), 1)
+        self.assertEqual(manager.request_refresh(['Brake Pads']), 2)
+        self.assertEqual(manager.request_refresh(['Wipers']), 3)
+        self.assertTrue(loader.loaded.wait(5))
+        time.sleep(0.3)
+        self.assertEqual(loader.calls, [({'Wipers', 'Brake Pads'}, True)])
+        self.assertEqual(manager.push_refreshes, 1)
+
+    def test_whole_table_request_absorbs_sheets(self):
+        loader = RecordingLoader()
+        manager = CatalogManager(loader, ttl=3600, debounce=0.1, max_delay=5)
+        manager.request_refresh(['Wipers'])
+        manager.request_refresh()
+        self.assertTrue(loader.loaded.wait(5))
+        self.assertEqual(loader.calls, [(None, True)])
+
+    def test_max_delay_bounds_a_steady_stream(self):
+        loader = RecordingLoader()
+        manager = CatalogManager(loader, ttl=3600, debounce=0.2, max_delay=0.3)
+        deadline = time.monotonic() + 1.0
+        # Запросы чаще debounce: без max_delay загрузка ждала бы конца потока
+        while time.monotonic() < deadline and not loader.loaded.is_set():
+            manager.request_refresh(['Wipers'])
+            time.sleep(0.05)
+        self.assertTrue(loader.loaded.is_set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import pickle
+import threading
+import time
+import unittest
+
+os.environ.setdefault('CATALOG_SNAPSHOT_PATH', '')
+
+import app  # noqa: E402
+from result_cache import ResultCache  # noqa: E402
+
+
+class ResultCacheTest(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResultCache(2)
+        cache.get_or_compute(('a',), lambda: 'A')
+        cache.get_or_compute(('b',), lambda: 'B')
+        cache.get_or_compute(('a',), lambda: 'stale')
+        cache.get_or_compute(('c',), lambda: 'C')
+        self.assertEqual(cache.get_or_compute(('a',), lambda: 'recomputed'), 'A')
+        self.assertEqual(cache.get_or_compute(('b',), lambda: 'recomputed'), 'recomputed')
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (2, 4, 2))
+
+    def test_concurrent_misses_compute_once(self):
+        cache = ResultCache(8)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_compute(('key',), compute)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 8)
+        self.assertEqual(cache.stats()['coalesced'], 7)
+
+    def test_errors_are_not_cached(self):
+        cache = ResultCache(8)
+
+        def fail():
+            raise RuntimeError('boom')
+
+        with self.assertRaises(RuntimeError):
+            cache.get_or_compute(('key',), fail)
+        self.assertEqual(cache.get_or_compute(('key',), lambda: 'ok'), 'ok')
+
+    def test_pickled_cache_is_empty(self):
+        cache = ResultCache(8)
+        cache.get_or_compute(('key',), lambda: 'value')
+        restored = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(restored.maxsize, 8)
+        self.assertEqual(restored.stats()['size'], 0)
+
+    def test_new_catalog_version_starts_with_empty_cache(self):
+        data = app.normalize_data([{'main_part': 'A1', 'alt_parts': 'B22', 'section': 'Front Wipers'}])
+        brake_pads = app.normalize_brake_pads_data([])
+        old = app.build_catalog('v1', data, brake_pads)
+        old.result_cache.get_or_compute(('search', 'A1'), lambda: 'old result')
+        # Копия того же снимка делит кэш, новая версия — нет
+        self.assertIs(old.replace(loaded_at=0).result_cache, old.result_cache)
+        new = app.build_catalog('v2', data, brake_pads)
+        self.assertEqual(new.result_cache.get_or_compute(('search', 'A1'), lambda: 'new result'), 'new result')
+
+
+if __name__ == '__main__':
+    unittest.main()
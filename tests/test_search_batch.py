@@ -0,0 +1,72 @@
+import io
+import json
+import os
+import unittest
+from unittest import mock
+
+os.environ.setdefault('CATALOG_SNAPSHOT_PATH', '')
+
+import app  # noqa: E402
+
+RAW_WIPERS = [{'main_part': 'A1', 'alt_parts': 'B22', 'section': 'Front Wipers'}]
+RAW_BRAKE_PADS = [{'main_part': 'P100', 'oe_analogue': '1K0 698 151', 'not_original': 'GDB1550', 'section': 'Front Brake Pads'}]
+
+
+class SearchBatchTest(unittest.TestCase):
+    def setUp(self):
+        catalog = app.build_catalog('v1', app.normalize_data(RAW_WIPERS), app.normalize_brake_pads_data(RAW_BRAKE_PADS))
+        patch = mock.patch.object(app.catalog_manager, 'get', return_value=catalog)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.client = app.app.test_client()
+
+    def lines(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    def test_json_array_gives_one_line_per_part_number(self):
+        lines = self.lines(self.client.post('/search-batch', json=[
+            'B22',
+            {'part_number': 'GDB1550', 'type': 'brake-pads'},
+            '',
+            {'part_number': 'A1', 'type': 'tyres'},
+        ]))
+        self.assertEqual([line['part_number'] for line in lines], ['B22', 'GDB1550', '', 'A1'])
+        self.assertEqual(lines[0]['results'][0]['main_parts'], ['A1'])
+        self.assertEqual(lines[1]['results'][0]['main_part'], 'P100')
+        self.assertEqual(lines[2]['error'], 'Part number not specified')
+        self.assertIn('error', lines[3])
+
+    def test_default_type_from_query_string(self):
+        lines = self.lines(self.client.post('/search-batch?type=brake_pads', json={'part_numbers': ['1K0698151']}))
+        self.assertEqual(lines[0]['type'], 'brake-pads')
+        self.assertEqual(lines[0]['results'][0]['main_part'], 'P100')
+
+    def test_csv_body_and_upload(self):
+        body = 'part_number,type\nB22\nGDB1550,brake-pads\n\n'
+        requests = {
+            'body': lambda: self.client.post('/search-batch', data=body, content_type='text/csv'),
+            'upload': lambda: self.client.post('/search-batch', data={'file': (io.BytesIO(body.encode('utf-8')), 'parts.csv')}),
+        }
+        for name, post in requests.items():
+            with self.subTest(name):
+                lines = self.lines(post())
+                self.assertEqual([(line['part_number'], line['type']) for line in lines],
+                                 [('B22', 'wipers'), ('GDB1550', 'brake-pads')])
+
+    def test_invalid_requests_are_rejected_before_streaming(self):
+        cases = {
+            'malformed json': lambda: self.client.post('/search-batch', data='[', content_type='application/json'),
+            'json object': lambda: self.client.post('/search-batch', json={'part_number': 'B22'}),
+            'unknown type': lambda: self.client.post('/search-batch?type=tyres', json=['B22']),
+        }
+        for name, post in cases.items():
+            with self.subTest(name):
+                response = post()
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.get_json())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import unittest
+from unittest import mock
+
+os.environ.setdefault('CATALOG_SNAPSHOT_PATH', '')
+
+import app  # noqa: E402
+
+RAW_WIPERS = [{'main_part': 'A1', 'alt_parts': 'B22', 'section': 'Front Wipers'}]
+RAW_BRAKE_PADS = [{'main_part': 'P100', 'oe_analogue': '1K0 698 151', 'not_original': 'GDB1550', 'section': 'Front Brake Pads'}]
+
+
+def make_catalog(version):
+    return app.build_catalog(version, app.normalize_data(RAW_WIPERS), app.normalize_brake_pads_data(RAW_BRAKE_PADS))
+
+
+class SearchETagTest(unittest.TestCase):
+    def setUp(self):
+        self.catalog = make_catalog('v1')
+        patch = mock.patch.object(app.catalog_manager, 'get', side_effect=lambda: self.catalog)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.client = app.app.test_client()
+
+    def test_get_is_cacheable(self):
+        for url in ('/search?part_number=B22', '/search-brake-pads?part_number=GDB1550', '/lookup?part_number=B22'):
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.headers['Cache-Control'], 'public, no-cache')
+                etag, weak = response.get_etag()
+                self.assertTrue(weak)
+                self.assertTrue(etag.startswith('v1-'))
+
+    def test_matching_etag_gives_not_modified_without_search(self):
+        etag = self.client.get('/search?part_number=B22').headers['ETag']
+        stats = self.catalog.result_cache.stats()
+        # Другое написание того же артикула — тот же ETag
+        response = self.client.get('/search?part_number=b-22', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(self.catalog.result_cache.stats(), stats)
+
+    def test_etag_depends_on_query_and_version(self):
+        etag = self.client.get('/search?part_number=B22').headers['ETag']
+        self.assertNotEqual(self.client.get('/search?part_number=B22&mode=direct').headers['ETag'], etag)
+        self.catalog = make_catalog('v2')
+        response = self.client.get('/search?part_number=B22', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_post_is_not_cacheable(self):
+        response = self.client.post('/search', json={'part_number': 'B22'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response.headers)
+        self.assertNotIn('Cache-Control', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
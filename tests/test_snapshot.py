@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+os.environ.setdefault('CATALOG_SNAPSHOT_PATH', '')
+
+import app  # noqa: E402
+import catalog as catalog_module  # noqa: E402
+from catalog import CatalogManager, load_snapshot, save_snapshot  # noqa: E402
+
+
+def make_catalog(version='v1'):
+    data = app.normalize_data([{'main_part': 'A1', 'alt_parts': 'B22', 'section': 'Front Wipers'}])
+    return app.build_catalog(version, data, app.normalize_brake_pads_data([]))
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'catalog_snapshot.pickle')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def rewrite(self, transform):
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        with open(self.path, 'wb') as f:
+            f.write(transform(content))
+
+    def test_round_trip(self):
+        save_snapshot(make_catalog(), self.path, 'sheet')
+        catalog = load_snapshot(self.path, 'sheet')
+        self.assertEqual(catalog.version, 'v1')
+        self.assertEqual(app.search_analogs_indexed('B22', catalog.wiper_index)[0]['main_part'], 'A1')
+        self.assertEqual(catalog_module.read_snapshot_version(self.path, 'sheet'), 'v1')
+
+    def test_missing_file(self):
+        self.assertIsNone(load_snapshot(self.path, 'sheet'))
+
+    def test_unusable_snapshots_are_ignored(self):
+        cases = {
+            'truncated': lambda content: content[:len(content) // 2],
+            'corrupted': lambda content: content[:-10] + b'x' * 10,
+            'empty': lambda content: b'',
+            'old format': lambda content: content.replace(
+                b' %d ' % catalog_module.SNAPSHOT_FORMAT, b' %d ' % (catalog_module.SNAPSHOT_FORMAT - 1), 1),
+        }
+        for name, transform in cases.items():
+            with self.subTest(name):
+                save_snapshot(make_catalog(), self.path, 'sheet')
+                self.rewrite(transform)
+                self.assertIsNone(load_snapshot(self.path, 'sheet'))
+
+    def test_snapshot_of_another_sheet_is_ignored(self):
+        save_snapshot(make_catalog(), self.path, 'sheet')
+        self.assertIsNone(load_snapshot(self.path, 'other'))
+        self.assertIsNone(catalog_module.read_snapshot_version(self.path, 'other'))
+
+    def test_manager_falls_back_to_loader_on_corrupt_snapshot(self):
+        save_snapshot(make_catalog('v1'), self.path, 'sheet')
+        self.rewrite(lambda content: content[:-10])
+        manager = CatalogManager(lambda current: make_catalog('v2'), ttl=3600, snapshot_path=self.path,
+                                 snapshot_source='sheet')
+        self.assertIsNone(manager.load_snapshot())
+        self.assertEqual(manager.preload().version, 'v2')
+        # Новая версия сразу записана на диск вместо испорченного файла
+        self.assertEqual(load_snapshot(self.path, 'sheet').version, 'v2')
+
+    def test_fresh_snapshot_is_not_refetched(self):
+        save_snapshot(make_catalog('v1'), self.path, 'sheet')
+        calls = []
+        manager = CatalogManager(lambda current: calls.append(1), ttl=3600, snapshot_path=self.path,
+                                 snapshot_source='sheet')
+        self.assertEqual(manager.preload().version, 'v1')
+        self.assertEqual(calls, [])
+        self.assertGreater(manager._refresh_delay(), 3000)
+
+
+if __name__ == '__main__':
+    unittest.main()